@@ -0,0 +1,133 @@
+"""Compares the latency of a query selecting several root connections
+through the asyncio connection resolver and through the Promise bridge it
+replaced.
+
+    python benchmarks/bench_connections.py [connections] [latency ms]
+
+Reads go to an in-process collection answering after ``latency``, each
+connection field has an async parent resolver like a permission check.
+"""
+import asyncio
+import sys
+import time
+from functools import partial
+
+import graphene
+from bson import ObjectId
+from graphql.execution.executors.asyncio import AsyncioExecutor
+from promise import Promise, is_thenable
+from umongo import Document, fields
+from umongo.frameworks import MotorAsyncIOInstance
+
+from graphene_umongo import UMongoConnectionField, UMongoObjectType
+
+instance = MotorAsyncIOInstance()
+
+
+@instance.register
+class Article(Document):
+    title = fields.StrField()
+    views = fields.IntField()
+
+    class Meta:
+        collection_name = 'article'
+
+
+class ArticleType(UMongoObjectType):
+    class Meta:
+        model = Article
+        interfaces = (graphene.relay.Node,)
+
+
+class LatencyCursor:
+    def __init__(self, documents, latency):
+        self.documents = documents
+        self.latency = latency
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        await asyncio.sleep(self.latency)
+        for document in self.documents:
+            yield document
+
+    async def close(self):
+        pass
+
+
+class LatencyCollection:
+    """Stands in for a Motor collection, every read takes ``latency``."""
+
+    def __init__(self, documents, latency):
+        self.documents = documents
+        self.latency = latency
+
+    def find(self, filter=None, projection=None, limit=0, skip=0, **kwargs):
+        end = skip + limit if limit else None
+        return LatencyCursor(self.documents[skip:end], self.latency)
+
+    async def estimated_document_count(self):
+        await asyncio.sleep(self.latency)
+        return len(self.documents)
+
+    async def count_documents(self, match, **kwargs):
+        await asyncio.sleep(self.latency)
+        return len(self.documents)
+
+
+class PromiseConnectionField(UMongoConnectionField):
+    @classmethod
+    def connection_resolver(cls, resolver, connection_type, model, options,
+                            root, info, **args):
+        resolved = resolver(root, info, **args)
+        on_resolve = partial(cls.resolve_connection, connection_type, model,
+                             options, info, args)
+        if is_thenable(resolved):
+            return Promise.resolve(resolved).then(on_resolve)
+
+        return on_resolve(resolved)
+
+
+async def resolve_allowed(root, info, **args):
+    await asyncio.sleep(0)
+    return None
+
+
+def build_schema(field_cls, count):
+    query = {
+        f'articles{i}': field_cls(ArticleType._meta.connection,
+                                  resolver=resolve_allowed)
+        for i in range(count)
+    }
+    return graphene.Schema(
+        query=type(f'{field_cls.__name__}Query', (graphene.ObjectType,),
+                   query))
+
+
+def main(count=8, latency=5):
+    queryset = ArticleType._meta.registry.get_queryset(Article)
+    queryset.collection = LatencyCollection([
+        {'_id': ObjectId(), 'title': f'title {i}', 'views': i}
+        for i in range(100)
+    ], latency / 1e3)
+
+    query = '{%s}' % ' '.join(
+        f'articles{i}(first: 10) {{ totalCount edges {{ node {{ title }} }} }}'
+        for i in range(count))
+
+    for name, field_cls in (('promise', PromiseConnectionField),
+                            ('asyncio', UMongoConnectionField)):
+        schema = build_schema(field_cls, count)
+        timings = []
+        for _ in range(20):
+            started = time.perf_counter()
+            result = schema.execute(query, executor=AsyncioExecutor())
+            timings.append(time.perf_counter() - started)
+            assert not result.errors, result.errors
+        print(f'{name:>8}: {min(timings) * 1e3:8.2f} ms '
+              f'({count} connections, {latency} ms per read)')
+
+
+if __name__ == '__main__':
+    main(*(int(a) for a in sys.argv[1:]))
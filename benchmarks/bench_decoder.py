@@ -0,0 +1,141 @@
+"""Compares the compiled document decoder with the recursive walk that
+``ObjectType.postprocess_db_response`` used to perform.
+
+    python benchmarks/bench_decoder.py [documents]
+"""
+import sys
+import timeit
+
+import graphene
+from bson import ObjectId
+from umongo import Document, EmbeddedDocument, fields
+from umongo.frameworks import MotorAsyncIOInstance
+
+from graphene_umongo import UMongoObjectType
+from graphene_umongo.converter import convert_umongo_model
+from graphene_umongo.registry import get_global_registry
+from graphene_umongo.utils import get_field_table
+
+instance = MotorAsyncIOInstance()
+
+
+@instance.register
+class Tag(EmbeddedDocument):
+    name = fields.StrField()
+    weight = fields.IntField()
+
+    class Meta:
+        abstract = False
+
+
+@instance.register
+class Article(Document):
+    title = fields.StrField()
+    body = fields.StrField()
+    views = fields.IntField()
+    tag = fields.EmbeddedField(Tag)
+
+    class Meta:
+        collection_name = 'article'
+
+
+class ArticleType(UMongoObjectType):
+    class Meta:
+        model = Article
+        interfaces = (graphene.relay.Node,)
+
+
+def get_field_names_convertor(model):
+    def _collect_fields(model):
+        _result = {}
+        for info in get_field_table(model):
+            if info.embedded_model:
+                _embed_fields = _collect_fields(info.embedded_model)
+                for o in info.offspring:
+                    _embed_fields.update(_collect_fields(o))
+                _result[info.mongo_name] = _embed_fields
+            else:
+                _result[info.mongo_name] = \
+                    'id' if info.mongo_name == '_id' else info.mongo_name
+        return _result
+
+    _conv = {'_id': 'id'}
+    _conv.update(_collect_fields(model))
+    return _conv
+
+
+def get_field_types_convertor(model):
+    registry = get_global_registry()
+    return {info.name: [convert_umongo_model(o, registry)
+                        for o in info.offspring]
+            for info in get_field_table(model) if info.embedded_model}
+
+
+def legacy_postprocess_db_response(cls, document, field_names_convertor,
+                                   field_types_convertor):
+    if not document:
+        return None
+
+    def _convert_embed_doc(document, converter):
+        result = document
+        for i in converter:
+            try:
+                result = i(**result)
+            except Exception as _:
+                continue
+            else:
+                break
+        return result
+
+    def _convert_document(document, converter):
+        fields = {}
+        for k, v in document.items():
+            conv = converter.get(k)
+            if isinstance(conv, str):
+                fields[conv] = v
+            elif isinstance(conv, dict):
+                embed_conv = field_types_convertor.get(k) or []
+                if isinstance(v, list):
+                    fields[k] = [
+                        _convert_embed_doc(
+                            _convert_document(d, conv), embed_conv)
+                        for d in v]
+                else:
+                    fields[k] = _convert_embed_doc(
+                        _convert_document(v, conv), embed_conv)
+        return fields
+
+    return cls(**_convert_document(
+        document, field_names_convertor))
+
+
+def main(count=10000):
+    documents = [{
+        '_id': ObjectId(),
+        'title': f'title {i}',
+        'body': 'body ' * 20,
+        'views': i,
+        'tag': {'name': 'tag', 'weight': i % 7},
+    } for i in range(count)]
+
+    # ObjectType used to build these for every type at startup
+    field_names_convertor = get_field_names_convertor(Article)
+    field_types_convertor = get_field_types_convertor(Article)
+
+    def _legacy():
+        for d in documents:
+            legacy_postprocess_db_response(
+                ArticleType, d, field_names_convertor, field_types_convertor)
+
+    def _compiled():
+        decode = ArticleType._meta.decoder
+        for d in documents:
+            decode(d)
+
+    for name, fn in (('legacy', _legacy), ('compiled', _compiled)):
+        best = min(timeit.repeat(fn, number=1, repeat=5))
+        print(f'{name:>10}: {best * 1e6 / count:8.2f} us/document')
+
+
+if __name__ == '__main__':
+    main(*(int(a) for a in sys.argv[1:]))
@@ -0,0 +1,87 @@
+"""Measures schema construction time for synthetic model sets.
+
+    python benchmarks/bench_schema.py [max models] [max depth]
+
+Every run registers fresh umongo documents, each with a chain of ``depth``
+embedded documents, builds one ``UMongoObjectType`` per document and a
+schema exposing them all through connections.
+"""
+import itertools
+import sys
+import time
+
+import graphene
+from umongo import Document, EmbeddedDocument, fields
+from umongo.frameworks import MotorAsyncIOInstance
+
+from graphene_umongo import UMongoConnectionField, UMongoObjectType
+from graphene_umongo.registry import Registry
+
+_runs = itertools.count()
+
+
+def _scalar_fields():
+    return {
+        'name': fields.StrField(),
+        'count': fields.IntField(),
+        'ratio': fields.FloatField(),
+        'active': fields.BoolField(),
+        'created': fields.DateTimeField(),
+    }
+
+
+def make_models(count, depth):
+    run = next(_runs)
+    instance = MotorAsyncIOInstance()
+
+    models = []
+    for i in range(count):
+        embedded = None
+        for d in range(depth):
+            attrs = _scalar_fields()
+            attrs['Meta'] = type('Meta', (), {'abstract': False})
+            if embedded:
+                attrs['child'] = fields.EmbeddedField(embedded)
+            embedded = instance.register(type(
+                f'R{run}M{i}E{d}', (EmbeddedDocument,), attrs))
+
+        attrs = _scalar_fields()
+        attrs['Meta'] = type('Meta', (), {
+            'collection_name': f'r{run}m{i}'})
+        if embedded:
+            attrs['child'] = fields.EmbeddedField(embedded)
+        models.append(instance.register(type(
+            f'R{run}M{i}', (Document,), attrs)))
+    return models
+
+
+def build_schema(models):
+    registry = Registry()
+    query = {}
+    for model in models:
+        meta = type('Meta', (), {
+            'model': model,
+            'registry': registry,
+            'interfaces': (graphene.relay.Node,),
+        })
+        _type = type(f'{model.__name__}Type', (UMongoObjectType,),
+                     {'Meta': meta})
+        query[model.__name__.lower()] = UMongoConnectionField(
+            _type._meta.connection)
+    return graphene.Schema(query=type('Query', (graphene.ObjectType,), query))
+
+
+def main(max_count=400, max_depth=3):
+    counts = [c for c in (25, 50, 100, 200, 400, 800) if c <= max_count]
+    print(f'{"models":>8} {"depth":>6} {"total ms":>10} {"ms/model":>10}')
+    for count, depth in itertools.product(counts, range(max_depth + 1)):
+        models = make_models(count, depth)
+        started = time.perf_counter()
+        build_schema(models)
+        elapsed = time.perf_counter() - started
+        print(f'{count:>8} {depth:>6} {elapsed * 1e3:>10.1f} '
+              f'{elapsed * 1e3 / count:>10.3f}')
+
+
+if __name__ == '__main__':
+    main(*(int(a) for a in sys.argv[1:]))
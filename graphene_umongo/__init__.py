@@ -1,18 +1,47 @@
+from .cache import DocumentCache as UMongoDocumentCache
+from .cost import CostAnalysisBackend as UMongoCostAnalysisBackend
+from .cost import cost_rule, get_query_cost, get_request_cost
+from .deadline import DeadlineExceeded as UMongoDeadlineExceeded
+from .deadline import get_remaining_time, set_request_deadline
 from .fields import ConnectionField as UMongoConnectionField
+from .fields import NodesField as UMongoNodesField
+from .fields import StreamField as UMongoStreamField
+from .planner import IndexPlanner as UMongoIndexPlanner
+from .planner import load_index_information
+from .querysets import AggregateQueryset as UMongoAggregateQueryset
 from .querysets import FindQueryset as UMongoFindQueryset
+from .types import BulkDocumentMutation as UMongoBulkDocumentMutation
+from .types import DocumentMutation as UMongoDocumentMutation
 from .types import InputObjectType as UMongoInputObjectType
 from .types import Mutation as UMongoMutation
 from .types import ObjectType as UMongoObjectType
+from .types import UpdateDocumentMutation as UMongoUpdateDocumentMutation
 from .utils import get_query
 
 __version__ = "0.0.1"
 
 __all__ = [
     "__version__",
+    "UMongoAggregateQueryset",
+    "UMongoBulkDocumentMutation",
     "UMongoConnectionField",
+    "UMongoCostAnalysisBackend",
+    "UMongoDeadlineExceeded",
+    "UMongoDocumentCache",
+    "UMongoDocumentMutation",
     "UMongoFindQueryset",
+    "UMongoIndexPlanner",
     "UMongoInputObjectType",
     "UMongoMutation",
+    "UMongoNodesField",
     "UMongoObjectType",
-    "get_query"
+    "UMongoStreamField",
+    "UMongoUpdateDocumentMutation",
+    "cost_rule",
+    "get_remaining_time",
+    "load_index_information",
+    "get_query",
+    "get_query_cost",
+    "get_request_cost",
+    "set_request_deadline"
 ]
\ No newline at end of file
@@ -0,0 +1,122 @@
+import time
+from collections import OrderedDict
+
+from bson import json_util
+
+
+class DocumentCache:
+    """Process wide LRU cache of decoded documents with a TTL.
+
+    Entries are keyed by ``_id`` plus the projection they were fetched with.
+    Attach it to a type with ``class Meta: document_cache = DocumentCache()``
+    and keep it fresh either by running :meth:`watch` over the collection
+    change stream or by calling :meth:`invalidate` after writes.
+    """
+
+    def __init__(self, maxsize=1024, ttl=60, clock=time.monotonic):
+        assert maxsize > 0, 'maxsize must be a positive integer'
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.clock = clock
+        self._entries = OrderedDict()
+        self._keys_by_id = {}
+        # Bumped by every invalidate, reads started before the last
+        # invalidation of their ``_id`` must not fill the cache
+        self._generation = 0
+        self._invalidated = {}
+        self._cleared = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def get_key(_id, projection):
+        return _id, json_util.dumps(projection or {}, sort_keys=True)
+
+    def get(self, _id, projection=None):
+        key = self.get_key(_id, projection)
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        expires, document = entry
+        if self.ttl is not None and expires <= self.clock():
+            self._remove(key)
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return document
+
+    def generation(self):
+        """Take before reading a document and pass to :meth:`set`."""
+        return self._generation
+
+    def set(self, _id, projection, document, generation=None):
+        if document is None:
+            return
+        if generation is not None and generation < max(
+                self._cleared, self._invalidated.get(_id, 0)):
+            return
+        key = self.get_key(_id, projection)
+        expires = self.clock() + self.ttl if self.ttl is not None else None
+        self._entries[key] = (expires, document)
+        self._entries.move_to_end(key)
+        self._keys_by_id.setdefault(_id, set()).add(key)
+
+        while len(self._entries) > self.maxsize:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.evictions += 1
+
+    def invalidate(self, _id=None):
+        self._generation += 1
+        if _id is None or len(self._invalidated) >= self.maxsize:
+            self._cleared = self._generation
+            self._invalidated.clear()
+        if _id is None:
+            self.invalidations += len(self._entries)
+            self._entries.clear()
+            self._keys_by_id.clear()
+            return
+        self._invalidated[_id] = self._generation
+        for key in self._keys_by_id.pop(_id, ()):
+            if self._entries.pop(key, None) is not None:
+                self.invalidations += 1
+
+    def _remove(self, key):
+        self._entries.pop(key, None)
+        keys = self._keys_by_id.get(key[0])
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._keys_by_id[key[0]]
+
+    def stats(self):
+        return {
+            'size': len(self._entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'invalidations': self.invalidations,
+        }
+
+    async def watch(self, collection, **kwargs):
+        """Invalidates entries from the collection change stream until the
+        stream ends or the task running it is cancelled.
+        """
+        try:
+            async for change in collection.watch(**kwargs):
+                if change.get('operationType') in ('drop', 'dropDatabase',
+                                                   'rename', 'invalidate'):
+                    self.invalidate()
+                    continue
+                document_key = change.get('documentKey') or {}
+                if '_id' in document_key:
+                    self.invalidate(document_key['_id'])
+        finally:
+            # Changes missed while not watching can't be trusted
+            self.invalidate()
@@ -4,10 +4,12 @@ from collections import OrderedDict
 import graphene
 import umongo
 from graphene.types.utils import yank_fields_from_attrs
+from graphene.utils.str_converters import to_snake_case
 
+from .instrumentation import field_scope, get_instrumentation
 from .registry import Registry, get_global_registry
-from .utils import (iter_fields, _iter_umongo_model_offspring, get_column_doc,
-                    is_column_required)
+from .utils import (get_field_table, _iter_umongo_model_offspring,
+                    get_column_doc, is_column_required)
 
 
 def construct_fields(m, registry,
@@ -15,9 +17,13 @@ def construct_fields(m, registry,
                      exclude_fields=None,
                      input_attributes=False):
     fields = OrderedDict()
-    for name, field_name, field in iter_fields(m, only_fields, exclude_fields):
-        converted_field = convert_umongo_field(
-            field, registry, input_attributes)
+    for info in get_field_table(m):
+        name = info.name
+        if (only_fields and name not in only_fields) or \
+                (exclude_fields and name in exclude_fields):
+            continue
+        converted_field = info.converter(
+            info.field, registry, input_attributes)
         if not converted_field:
             continue
         elif isinstance(converted_field, list):
@@ -125,8 +131,6 @@ def convert_uuid_field(f,
 
 
 @convert_umongo_type.register(umongo.fields.ObjectIdField)
-@convert_umongo_type.register(umongo.fields.ReferenceField)
-@convert_umongo_type.register(umongo.fields.GenericReferenceField)
 @convert_umongo_type.register(umongo.fields.StringField)
 @convert_umongo_type.register(umongo.fields.StrField)
 @convert_umongo_type.register(umongo.fields.FormattedStringField)
@@ -144,6 +148,96 @@ def convert_str_field(f,
         required=not (is_column_required(f, input_attributes)))
 
 
+def _get_reference_model_name(f):
+    if isinstance(f.document, str):
+        return f.document
+    return f.document.__name__
+
+
+def _get_generic_reference_union(registry):
+    t = registry.get_union('GenericReference')
+    if not t:
+        fields = {'Meta': type('Meta', (), {'types': registry.get_types()})}
+        t = type('GenericReference', (graphene.Union,), fields)
+        registry.register_union('GenericReference', t)
+    return t
+
+
+async def _load_in_field_scope(loader, value, info):
+    with field_scope(info):
+        return await loader.load(value)
+
+
+def resolve_reference(f, model_name, registry, root, info, **args):
+    from .loaders import get_loader
+
+    attname = f.attribute or to_snake_case(info.field_name)
+    if isinstance(root, dict):
+        value = root.get(attname)
+    else:
+        value = getattr(root, attname, None)
+
+    if isinstance(value, dict):
+        model_name, value = value.get('_cls'), value.get('_id')
+
+    _type = registry.get_type_for_model_name(model_name)
+    if value is None or not _type:
+        return None
+    loader = get_loader(info, _type._meta.model, registry)
+    if isinstance(value, _type):
+        # Already joined by the queryset
+        if getattr(value, 'id', None) is not None:
+            loader.prime(value.id, value)
+        return value
+    if get_instrumentation(info.context) is not None:
+        return _load_in_field_scope(loader, value, info)
+    return loader.load(value)
+
+
+@convert_umongo_type.register(umongo.fields.ReferenceField)
+def convert_reference_field(f,
+                            registry=None,
+                            input_attributes=False):
+    if input_attributes or f.attribute == '_id':
+        return convert_str_field(f, registry, input_attributes)
+    if not registry:
+        registry = get_global_registry()
+
+    def dynamic_type():
+        _type = registry.get_type_for_model_name(_get_reference_model_name(f))
+        if not _type:
+            return convert_str_field(f, registry, input_attributes)
+        return graphene.Field(
+            _type,
+            description=get_column_doc(f),
+            required=not (is_column_required(f, input_attributes)),
+            resolver=functools.partial(
+                resolve_reference, f, _get_reference_model_name(f), registry))
+
+    return graphene.Dynamic(dynamic_type)
+
+
+@convert_umongo_type.register(umongo.fields.GenericReferenceField)
+def convert_generic_reference_field(f,
+                                    registry=None,
+                                    input_attributes=False):
+    if input_attributes or f.attribute == '_id':
+        return convert_str_field(f, registry, input_attributes)
+    if not registry:
+        registry = get_global_registry()
+
+    def dynamic_type():
+        if not registry.get_types():
+            return convert_str_field(f, registry, input_attributes)
+        return graphene.Field(
+            _get_generic_reference_union(registry),
+            description=get_column_doc(f),
+            required=not (is_column_required(f, input_attributes)),
+            resolver=functools.partial(resolve_reference, f, None, registry))
+
+    return graphene.Dynamic(dynamic_type)
+
+
 @convert_umongo_type.register(umongo.fields.BooleanField)
 @convert_umongo_type.register(umongo.fields.BoolField)
 def convert_bool_field(f,
@@ -271,10 +365,17 @@ def convert_list_field(f,
             input_attributes,
             graphene.types.resolver.dict_resolver)
     else:
-        _type = type(convert_umongo_type(
+        _converted = convert_umongo_type(
             f.container,
             registry,
-            input_attributes))
+            input_attributes)
+        if isinstance(_converted, list):
+            # GraphQL has no input unions to list polymorphic inputs with
+            return None
+        if isinstance(_converted, graphene.Field):
+            _type = _converted.type
+        else:
+            _type = type(_converted)
     return graphene.List(
         _type,
         description=get_column_doc(f),
@@ -0,0 +1,285 @@
+import functools
+
+import graphene
+from graphql import GraphQLError
+from graphql.backend.core import GraphQLCoreBackend
+from graphql.execution import ExecutionResult, execute
+from graphql.language import ast
+from graphql.type.definition import GraphQLObjectType, get_named_type
+from graphql.validation import validate
+from graphql.validation.rules import specified_rules
+from graphql.validation.rules.base import ValidationRule
+from promise import Promise
+
+from .converter import resolve_reference
+from .objecttype import ObjectType
+from .pagination import set_default_page_size
+from .utils import _ast_value, get_context_state
+
+DEFAULT_PAGE_SIZE = 100
+
+
+class QueryCost:
+    """Estimates the documents an operation reads before it runs.
+
+    Connections read ``first`` or ``last`` documents, ``default_page_size``
+    when neither is given, for every parent above them. References and root
+    document fields read one document per parent. Documents count as the
+    ``cost_weight`` of their ``ObjectType``, a selected ``totalCount`` as
+    one more read per connection.
+    """
+
+    def __init__(self, schema, fragments=None, variables=None,
+                 default_page_size=DEFAULT_PAGE_SIZE):
+        self.schema = schema
+        self.fragments = fragments or {}
+        self.variables = variables or {}
+        self.default_page_size = default_page_size
+
+    def get_weight(self, graphql_type):
+        if isinstance(graphql_type, GraphQLObjectType):
+            _meta = getattr(getattr(graphql_type, 'graphene_type', None),
+                            '_meta', None)
+            return getattr(_meta, 'cost_weight', 1)
+        return max((self.get_weight(t)
+                    for t in self.schema.get_possible_types(graphql_type)),
+                   default=1)
+
+    def is_document_type(self, graphql_type):
+        if isinstance(graphql_type, GraphQLObjectType):
+            _type = getattr(graphql_type, 'graphene_type', None)
+            return isinstance(_type, type) and issubclass(_type, ObjectType)
+        if not hasattr(graphql_type, 'resolve_type'):
+            return False
+        return any(self.is_document_type(t)
+                   for t in self.schema.get_possible_types(graphql_type))
+
+    def get_page_size(self, args):
+        for name in ('first', 'last'):
+            if isinstance(args.get(name), int):
+                return args[name]
+        return self.default_page_size
+
+    def iter_fields(self, selection_set, parent_type):
+        for selection in selection_set.selections:
+            if isinstance(selection, ast.Field):
+                yield selection, parent_type
+                continue
+            if isinstance(selection, ast.FragmentSpread):
+                selection = self.fragments.get(selection.name.value)
+                if selection is None:
+                    continue
+            _type = parent_type
+            if selection.type_condition:
+                _type = self.schema.get_type(
+                    selection.type_condition.name.value) or parent_type
+            yield from self.iter_fields(selection.selection_set, _type)
+
+    def _reads_document(self, field_def, named_type, root):
+        resolver = field_def.resolver
+        if isinstance(resolver, functools.partial) and \
+                resolver.func is resolve_reference:
+            return True
+        return root and self.is_document_type(named_type)
+
+    def get_selection_cost(self, selection_set, parent_type, multiplier=1,
+                           root=False):
+        cost = 0
+        for field, _type in self.iter_fields(selection_set, parent_type):
+            field_def = getattr(_type, 'fields', {}).get(field.name.value)
+            if field_def is None:
+                continue
+            named_type = get_named_type(field_def.type)
+            graphene_type = getattr(named_type, 'graphene_type', None)
+            args = {a.name.value: _ast_value(a.value, self.variables)
+                    for a in field.arguments or ()}
+
+            if isinstance(graphene_type, type) and \
+                    issubclass(graphene_type, graphene.relay.Connection):
+                page_size = self.get_page_size(args)
+                edge_type = get_named_type(named_type.fields['edges'].type)
+                node_type = get_named_type(edge_type.fields['node'].type)
+                cost += multiplier * page_size * self.get_weight(node_type)
+                if not field.selection_set:
+                    continue
+                if any(f.name.value == 'totalCount' for f, _ in
+                       self.iter_fields(field.selection_set, named_type)):
+                    cost += multiplier
+                cost += self.get_selection_cost(
+                    field.selection_set, named_type, multiplier * page_size)
+            elif self._reads_document(field_def, named_type, root):
+                # NodesField reads one document per id
+                count = len(args['ids']) \
+                    if isinstance(args.get('ids'), list) else 1
+                cost += multiplier * count * self.get_weight(named_type)
+                if field.selection_set:
+                    cost += self.get_selection_cost(
+                        field.selection_set, named_type, multiplier * count)
+            elif field.selection_set:
+                cost += self.get_selection_cost(
+                    field.selection_set, named_type, multiplier)
+        return cost
+
+    def get_operation_cost(self, operation):
+        root_type = {
+            'query': self.schema.get_query_type,
+            'mutation': self.schema.get_mutation_type,
+            'subscription': self.schema.get_subscription_type,
+        }[operation.operation]()
+        if root_type is None:
+            return 0
+        return self.get_selection_cost(
+            operation.selection_set, root_type,
+            root=root_type is self.schema.get_query_type())
+
+
+def get_document_fragments(document_ast):
+    return {d.name.value: d for d in document_ast.definitions
+            if isinstance(d, ast.FragmentDefinition)}
+
+
+def get_operation(document_ast, operation_name=None):
+    """The operation ``graphql.execute`` would run, ``None`` when the name
+    matches none or is missing while the document has several.
+    """
+    operations = [d for d in document_ast.definitions
+                  if isinstance(d, ast.OperationDefinition)]
+    if operation_name is None:
+        return operations[0] if len(operations) == 1 else None
+    for operation in operations:
+        if operation.name and operation.name.value == operation_name:
+            return operation
+    return None
+
+
+def get_operation_variables(operation, variables=None):
+    """``variables`` completed with the defaults ``operation`` declares, as
+    graphql-core coerces them before executing it.
+    """
+    _variables = dict(variables or {})
+    for definition in operation.variable_definitions or ():
+        name = definition.variable.name.value
+        if name not in _variables and definition.default_value is not None:
+            _variables[name] = _ast_value(definition.default_value, None)
+    return _variables
+
+
+def get_query_cost(schema, document_ast, variables=None, operation_name=None,
+                   default_page_size=DEFAULT_PAGE_SIZE):
+    """Estimates the cost of the operation ``graphql.execute`` would run."""
+    operation = get_operation(document_ast, operation_name)
+    if operation is None:
+        return 0
+    estimator = QueryCost(schema, get_document_fragments(document_ast),
+                          get_operation_variables(operation, variables),
+                          default_page_size)
+    return estimator.get_operation_cost(operation)
+
+
+class QueryCostRule(ValidationRule):
+    max_cost = None
+    variables = None
+    operation_name = None
+    default_page_size = DEFAULT_PAGE_SIZE
+    on_cost = None
+
+    def enter_OperationDefinition(self, node, *args):
+        # Only the operation that runs reads documents
+        if node is not get_operation(self.context.get_ast(),
+                                     self.operation_name):
+            return
+        estimator = QueryCost(
+            self.context.get_schema(),
+            get_document_fragments(self.context.get_ast()),
+            get_operation_variables(node, self.variables),
+            self.default_page_size)
+        cost = estimator.get_operation_cost(node)
+        if self.on_cost is not None:
+            self.on_cost(node, cost)
+        if self.max_cost is not None and cost > self.max_cost:
+            self.context.report_error(GraphQLError(
+                f'Query cost {cost} exceeds the maximum cost of '
+                f'{self.max_cost}', [node]))
+
+
+def cost_rule(max_cost=None, variables=None,
+              default_page_size=DEFAULT_PAGE_SIZE, on_cost=None,
+              operation_name=None):
+    """Returns a validation rule rejecting operations costing more than
+    ``max_cost``, for ``graphql.validate(schema, document, rules)``.
+
+    Variables and the operation name are only known per request, build the
+    rule with them. ``on_cost(operation, cost)`` is called for the operation
+    that will run.
+    """
+    return type('QueryCostRule', (QueryCostRule,), {
+        'max_cost': max_cost,
+        'variables': variables,
+        'operation_name': operation_name,
+        'default_page_size': default_page_size,
+        'on_cost': staticmethod(on_cost) if on_cost else None,
+    })
+
+
+def get_request_cost(context):
+    """The cost of the operation executed with ``context``."""
+    return get_context_state(context).get('cost')
+
+
+class CostAnalysisBackend(GraphQLCoreBackend):
+    """Rejects operations costing more than ``max_cost`` during validation,
+    before any document is read.
+
+    Pass it to ``schema.execute(..., backend=CostAnalysisBackend(1000))``.
+    The cost is kept on the context, see :func:`get_request_cost`, and
+    returned in the ``cost`` extension of the result. Connections queried
+    without ``first`` nor ``last`` read ``default_page_size`` documents, as
+    they were scored.
+    """
+
+    def __init__(self, max_cost=None, default_page_size=DEFAULT_PAGE_SIZE,
+                 executor=None):
+        super().__init__(executor)
+        self.max_cost = max_cost
+        self.default_page_size = default_page_size
+
+    def document_from_string(self, schema, document_string):
+        document = super().document_from_string(schema, document_string)
+        document.execute = functools.partial(
+            self.execute, schema, document.document_ast,
+            **self.execute_params)
+        return document
+
+    def execute(self, schema, document_ast, root_value=None,
+                context_value=None, **kwargs):
+        costs = []
+
+        def on_cost(operation, cost):
+            costs.append(cost)
+
+        rule = cost_rule(self.max_cost, kwargs.get('variable_values'),
+                         self.default_page_size, on_cost,
+                         kwargs.get('operation_name'))
+        rules = [rule]
+        if kwargs.pop('validate', True):
+            rules = specified_rules + rules
+        errors = validate(schema, document_ast, rules)
+
+        cost = costs[0] if costs else None
+        extensions = {'cost': {'requested': cost, 'maximum': self.max_cost}}
+        if errors:
+            return ExecutionResult(errors=errors, invalid=True,
+                                   extensions=extensions)
+
+        get_context_state(context_value)['cost'] = cost
+        set_default_page_size(context_value, self.default_page_size)
+        result = execute(schema, document_ast, root_value, context_value,
+                         **kwargs)
+
+        def _add_extensions(result):
+            result.extensions = dict(result.extensions or {}, **extensions)
+            return result
+
+        if isinstance(result, Promise):
+            return result.then(_add_extensions)
+        return _add_extensions(result)
@@ -0,0 +1,33 @@
+import time
+
+from graphql import GraphQLError
+
+from .utils import get_context_state
+
+
+class DeadlineExceeded(GraphQLError):
+    pass
+
+
+def set_request_deadline(context, timeout):
+    """Gives the request ``timeout`` seconds, reads issued through its
+    queryset run with the remaining time as ``maxTimeMS`` and are cancelled
+    once it is spent.
+    """
+    get_context_state(context)['deadline'] = time.monotonic() + timeout
+
+
+def get_request_deadline(context):
+    if context is None:
+        return None
+    return get_context_state(context).get('deadline')
+
+
+def get_remaining_time(context):
+    """Seconds left before the deadline of the request, ``None`` when it
+    has none.
+    """
+    deadline = get_request_deadline(context)
+    if deadline is None:
+        return None
+    return deadline - time.monotonic()
@@ -0,0 +1,215 @@
+import uuid
+from functools import lru_cache, partial
+
+import graphene
+import umongo
+from bson import ObjectId
+
+from .converter import _get_reference_model_name, convert_umongo_model
+from .utils import (DISCRIMINATOR_FIELD, decode_global_id, get_field_table,
+                    get_pk_value, get_reference_model,
+                    _iter_umongo_model_offspring)
+
+
+def _from_mongo_world(mongo_field):
+    if mongo_field == '_id':
+        return 'id'
+    return mongo_field
+
+
+def _list_decoder(decode):
+    def _decode(values):
+        return [decode(v) for v in values]
+    return _decode
+
+
+def _reference_decoder(f, registry):
+    model_name = _get_reference_model_name(f)
+
+    def _decode(value):
+        # References joined by ``$lookup`` hold the whole document
+        if not isinstance(value, dict):
+            return value
+        _type = registry.get_type_for_model_name(model_name)
+        if not _type:
+            return value.get('_id')
+        return _type._meta.decoder(value)
+    return _decode
+
+
+def _iter_models(model, offspring):
+    yield model
+    if offspring:
+        yield from _iter_umongo_model_offspring(model)
+
+
+def compile_table(model, registry, ids=True, offspring=False):
+    """Builds a flat ``{mongo key: (attribute, decoder)}`` table for
+    ``model``, ``decoder`` is ``None`` for values that are passed through
+    untouched.
+    """
+    table = {'_id': ('id', None)} if ids else {}
+    for m in _iter_models(model, offspring):
+        for info in get_field_table(m):
+            f = info.field
+            mongo_field = info.mongo_name
+            decode = None
+            embedded_doc = info.embedded_model
+            if embedded_doc:
+                decode = compile_embedded_decoder(embedded_doc, registry)
+                if info.is_list:
+                    decode = _list_decoder(decode)
+            elif isinstance(f, umongo.fields.ReferenceField) and \
+                    f.attribute != '_id':
+                decode = _reference_decoder(f, registry)
+            table[mongo_field] = (_from_mongo_world(mongo_field), decode)
+    return table
+
+
+def _decode_fields(table, document):
+    fields = {}
+    for k, v in document.items():
+        entry = table.get(k)
+        if entry is None:
+            continue
+        attname, decode = entry
+        fields[attname] = v if decode is None or v is None else decode(v)
+    return fields
+
+
+def compile_embedded_decoder(embedded_doc, registry):
+    table = compile_table(embedded_doc, registry, ids=False, offspring=True)
+
+    if not getattr(embedded_doc.Meta, 'abstract', False):
+        # Concrete embedded types are served by ``dict_resolver``
+        def _decode(document):
+            return _decode_fields(table, document)
+        return _decode
+
+    types = [convert_umongo_model(o, registry)
+             for o in _iter_umongo_model_offspring(embedded_doc)]
+    # umongo stores the concrete class name of child documents in ``_cls``
+    discriminated = {
+        o.__name__: (t, compile_table(o, registry, ids=False))
+        for o, t in zip(_iter_umongo_model_offspring(embedded_doc), types)
+    }
+
+    def _decode(document):
+        entry = discriminated.get(document.get(DISCRIMINATOR_FIELD))
+        if entry is not None:
+            t, _table = entry
+            return t(**_decode_fields(_table, document))
+
+        fields = _decode_fields(table, document)
+        for t in types:
+            try:
+                return t(**fields)
+            except TypeError:
+                continue
+        return fields
+    return _decode
+
+
+def compile_document_decoder(cls, model, registry, ids=True):
+    table = compile_table(model, registry, ids)
+    defaults = None
+
+    def _decode(document):
+        nonlocal defaults
+        if not document:
+            return None
+        if defaults is None:
+            # Fields are only final once graphene has built the type
+            defaults = {n: None for n in cls._meta.fields}
+        # Same state graphene.ObjectType.__init__ sets up, without the
+        # per-field setattr
+        instance = cls.__new__(cls)
+        instance.__dict__.update(defaults)
+        instance.__dict__.update(_decode_fields(table, document))
+        return instance
+    return _decode
+
+
+def _to_object_id(value):
+    if isinstance(value, str) and ObjectId.is_valid(value):
+        return ObjectId(value)
+    return value
+
+
+def _to_uuid(value):
+    if isinstance(value, str):
+        try:
+            return uuid.UUID(value)
+        except ValueError:
+            pass
+    return value
+
+
+def _unwrap_input_type(_type):
+    is_list = False
+    while isinstance(_type, (graphene.NonNull, graphene.List)):
+        is_list = is_list or isinstance(_type, graphene.List)
+        _type = _type.of_type
+    return _type, is_list
+
+
+def _id_decoder(convert, model_name=None):
+    def _decode(value, references=None):
+        value = convert(decode_global_id(value)[1])
+        if model_name and references is not None:
+            references.setdefault(model_name, []).append(value)
+        return value
+    return _decode
+
+
+def _input_list_decoder(decode):
+    def _decode(values, references=None):
+        return [v if v is None else decode(v, references) for v in values]
+    return _decode
+
+
+@lru_cache(maxsize=None)
+def compile_input_decoder(input_type, model=None):
+    """Compiles the conversion of ``input_type`` values into database
+    values: which fields hold ids and how to convert them is decided once
+    from the umongo fields of ``model``.
+
+    The decoder takes an optional ``references`` dict collecting the ids of
+    referenced documents by model name.
+    """
+    table = {i.name: i for i in get_field_table(model)} if model else {}
+    steps = {}
+    for name, field in input_type._meta.fields.items():
+        _type, is_list = _unwrap_input_type(field.type)
+        info = table.get(name)
+        f = info.field if info else None
+
+        if name == 'id' or getattr(f, 'attribute', None) == '_id':
+            decode = _id_decoder(partial(get_pk_value, model)
+                                 if model else _to_object_id)
+        elif isinstance(f, umongo.fields.ReferenceField):
+            decode = _id_decoder(
+                partial(get_pk_value, get_reference_model(model, f)),
+                _get_reference_model_name(f))
+        elif isinstance(f, umongo.fields.ObjectIdField):
+            decode = _id_decoder(_to_object_id)
+        elif isinstance(f, umongo.fields.UUIDField):
+            decode = _id_decoder(_to_uuid)
+        elif f is None and _type is graphene.ID:
+            decode = _id_decoder(_to_object_id)
+        elif isinstance(_type, type) and \
+                issubclass(_type, graphene.InputObjectType):
+            decode = compile_input_decoder(
+                _type, info.embedded_model if info else None)
+        else:
+            continue
+        steps[name] = _input_list_decoder(decode) if is_list else decode
+
+    def _decode(value, references=None):
+        result = dict(value)
+        for k, decode in steps.items():
+            v = result.get(k)
+            if v is not None:
+                result[k] = decode(v, references)
+        return result
+    return _decode
@@ -1,22 +1,74 @@
+import asyncio
+import inspect
 from functools import partial
 
 import graphene
-from graphene.relay import Connection
 from graphene.relay.connection import PageInfo
+from graphql import GraphQLError
 from graphql_relay.connection.arrayconnection import connection_from_list_slice
-from promise import Promise, is_thenable
 
-from .registry import get_global_registry
-from .utils import get_query
+from .filters import filter_argument_for_model
+from .instrumentation import field_scope
+from .loaders import get_children_loader
+from .pagination import (apply_default_page_size, connection_from_keyset_page,
+                         connection_from_page, cursor_to_keyset,
+                         get_keyset_sort, get_window, get_window_limit,
+                         needs_count, reverse_sort)
+from .querysets import get_read_preference, get_request_queryset
+from .utils import (_get_umongo_python_world_fields, get_query,
+                    get_query_match, get_query_projection, get_sort,
+                    is_field_selected, sort_argument_for_model)
+
+
+def get_field_type_model(_type):
+    from .types import ObjectType
+
+    if not isinstance(_type, type):
+        return None
+    if issubclass(_type, graphene.relay.Connection):
+        _type = _type.Edge.node._type
+    if isinstance(_type, type) and issubclass(_type, ObjectType):
+        return _type._meta.model
+    return None
+
+
+class Connection(graphene.relay.Connection):
+    class Meta:
+        abstract = True
+
+    total_count = graphene.Int()
+
+    def resolve_total_count(self, info, **args):
+        return self.length
 
 
 class UnsortedConnectionField(graphene.relay.ConnectionField):
+    def __init__(self, type, *args,
+                 keyset=False,
+                 total_count_limit=None,
+                 total_count_cache=None,
+                 foreign_key=None,
+                 local_key='id',
+                 read_preference=None,
+                 max_staleness_seconds=None,
+                 **kwargs):
+        self.options = {
+            'keyset': keyset,
+            'total_count_limit': total_count_limit,
+            'total_count_cache': total_count_cache,
+            'foreign_key': foreign_key,
+            'local_key': local_key,
+            'read_preference': get_read_preference(
+                read_preference, max_staleness_seconds),
+        }
+        super().__init__(type, *args, **kwargs)
+
     @property
     def type(self):
         from .types import ObjectType
 
         _type = super(graphene.relay.ConnectionField, self).type
-        if issubclass(_type, Connection):
+        if issubclass(_type, graphene.relay.Connection):
             return _type
         assert issubclass(_type, ObjectType),\
             f'{self.__class__.__name__} ' \
@@ -31,55 +83,252 @@ class UnsortedConnectionField(graphene.relay.ConnectionField):
         return self.type._meta.node._meta.model
 
     @classmethod
-    async def get_query(cls, model, info, sort=None, **args):
-        reg = get_global_registry()
-        queryset = reg.get_queryset(model)
-        query = await get_query(model, queryset.find, info)
-        if sort is not None:
-            if isinstance(sort, str):
-                query = query.order_by(sort.value)
+    def get_queryset(cls, model, options, info):
+        return get_request_queryset(
+            model, info.context,
+            read_preference=options.get('read_preference'))
+
+    @classmethod
+    async def get_query(cls, model, info, sort=None, limit=0, skip=0,
+                        read_preference=None, **args):
+        queryset = get_request_queryset(model, info.context,
+                                        read_preference=read_preference)
+        return await get_query(model, queryset.find, info,
+                               connection=True,
+                               args=args,
+                               limit=limit, skip=skip, sort=get_sort(sort))
+
+    @classmethod
+    def get_total_count(cls, model, options, info, args):
+        if not is_field_selected(info, 'totalCount'):
+            return None
+        queryset = cls.get_queryset(model, options, info)
+        return asyncio.ensure_future(queryset.count(
+            get_query_match(model, info, args),
+            limit=options.get('total_count_limit'),
+            cache_ttl=options.get('total_count_cache')))
+
+    @classmethod
+    async def resolve_paginated_connection(cls, connection_type, model,
+                                           options, info, args):
+        queryset = cls.get_queryset(model, options, info)
+
+        if queryset.supports_facet and not needs_count(args) and \
+                not options.get('total_count_cache') and \
+                is_field_selected(info, 'totalCount'):
+            return await cls.resolve_faceted_connection(
+                connection_type, model, options, info, args)
+
+        total_count = cls.get_total_count(model, options, info, args)
+        try:
+            # Only an exact count places a ``last`` window, a cached or
+            # capped one is only good enough to be reported
+            count = None
+            if needs_count(args) and total_count and \
+                    not options.get('total_count_limit') and \
+                    not options.get('total_count_cache'):
+                count = await total_count
+            elif needs_count(args):
+                count = await queryset.count(
+                    get_query_match(model, info, args))
+
+            start, end = get_window(args, count)
+            if end is not None and end <= start and not isinstance(
+                    args.get('first'), int):
+                page = []
             else:
-                query = query.order_by(*(col.value for col in sort))
-        return query
+                page = await cls.get_query(
+                    model, info,
+                    limit=get_window_limit(start, end),
+                    skip=start,
+                    read_preference=options.get('read_preference'),
+                    **args)
+        except Exception:
+            if total_count:
+                total_count.cancel()
+            raise
+
+        connection = connection_from_page(page, args, start, end,
+                                          connection_type=connection_type,
+                                          edge_type=connection_type.Edge,
+                                          pageinfo_type=PageInfo)
+        connection.iterable = page
+        connection.length = total_count
+        return connection
 
     @classmethod
-    async def resolve_connection(cls, connection_type, model, info, args,
-                                 resolved):
-        if resolved is None:
-            resolved = await cls.get_query(model, info, **args)
-
-        _len = len(resolved)
-        connection = connection_from_list_slice(resolved, args, slice_start=0,
-                                                list_length=_len,
-                                                list_slice_length=_len,
-                                                connection_type=connection_type,
-                                                pageinfo_type=PageInfo,
-                                                edge_type=connection_type.Edge)
-        connection.iterable = resolved
-        connection.length = _len
+    async def resolve_faceted_connection(cls, connection_type, model,
+                                         options, info, args):
+        queryset = cls.get_queryset(model, options, info)
+
+        start, end = get_window(args)
+        page, count = await get_query(
+            model, queryset.find_with_count, info,
+            connection=True,
+            args=args,
+            limit=get_window_limit(start, end),
+            skip=start,
+            sort=get_sort(args.get('sort')),
+            count_limit=options.get('total_count_limit'))
+
+        connection = connection_from_page(page, args, start, end,
+                                          connection_type=connection_type,
+                                          edge_type=connection_type.Edge,
+                                          pageinfo_type=PageInfo)
+        connection.iterable = page
+        connection.length = count
         return connection
 
     @classmethod
-    def connection_resolver(cls, resolver, connection_type, model, root, info,
-                            **args):
-        resolved = resolver(root, info, **args)
-        on_resolve = partial(cls.resolve_connection, connection_type, model,
-                             info, args)
-        if is_thenable(resolved):
-            return Promise.resolve(resolved).then(on_resolve)
+    async def resolve_children_connection(cls, connection_type, model,
+                                          options, root, info, args):
+        local_key = options['local_key']
+        parent_key = root.get(local_key) if isinstance(root, dict) \
+            else getattr(root, local_key, None)
+        foreign_key = options['foreign_key']
+        args = dict(args)
 
-        return on_resolve(resolved)
+        # Backward pages need each parent's count and grouped pages need a
+        # page size and $topN, otherwise parents are read one by one
+        if isinstance(args.get('last'), int) or args.get('before') or \
+                options.get('keyset') or \
+                not isinstance(args.get('first'), int) or \
+                not await cls.get_queryset(
+                    model, options, info).supports_grouped_pages():
+            args[foreign_key] = parent_key
+            if options.get('keyset'):
+                return await cls.resolve_keyset_connection(
+                    connection_type, model, options, info, args)
+            return await cls.resolve_paginated_connection(
+                connection_type, model, options, info, args)
+
+        start, end = get_window(args)
+        page, count = [], 0
+        if parent_key is not None:
+            match = get_query_match(model, info, args)
+            loader = get_children_loader(
+                info, model,
+                _get_umongo_python_world_fields(model).get(
+                    foreign_key, foreign_key),
+                match,
+                get_query_projection(model, info, match, connection=True),
+                sort=get_sort(args.get('sort')),
+                skip=start,
+                limit=get_window_limit(start, end),
+                count_limit=options.get('total_count_limit'),
+                read_preference=options.get('read_preference'))
+            page, count = await loader.load(parent_key)
+
+        connection = connection_from_page(page, args, start, end,
+                                          connection_type=connection_type,
+                                          edge_type=connection_type.Edge,
+                                          pageinfo_type=PageInfo)
+        connection.iterable = page
+        connection.length = count
+        return connection
+
+    @classmethod
+    async def resolve_keyset_connection(cls, connection_type, model, options,
+                                        info, args):
+        queryset = cls.get_queryset(model, options, info)
+
+        first = args.get('first')
+        last = args.get('last')
+        sort = get_keyset_sort(get_sort(args.get('sort')))
+        after = cursor_to_keyset(args.get('after'), sort)
+        before = cursor_to_keyset(args.get('before'), sort)
+
+        total_count = cls.get_total_count(model, options, info, args)
+        try:
+            if isinstance(last, int):
+                page = await get_query(model, queryset.find, info,
+                                       connection=True,
+                                       args=args,
+                                       limit=last + 1,
+                                       sort=reverse_sort(sort),
+                                       seek={'after': before,
+                                             'before': after})
+            else:
+                page = await get_query(model, queryset.find, info,
+                                       connection=True,
+                                       args=args,
+                                       limit=first + 1 if isinstance(
+                                           first, int) else 0,
+                                       sort=sort,
+                                       seek={'after': after,
+                                             'before': before})
+        except Exception:
+            if total_count:
+                total_count.cancel()
+            raise
+
+        connection = connection_from_keyset_page(
+            page, args, model, sort,
+            connection_type=connection_type,
+            edge_type=connection_type.Edge,
+            pageinfo_type=PageInfo)
+        connection.iterable = page
+        connection.length = total_count
+        return connection
+
+    @classmethod
+    async def resolve_connection(cls, connection_type, model, options, info,
+                                 args, resolved, root=None):
+        args = apply_default_page_size(args, info.context)
+        with field_scope(info):
+            if resolved is None and options.get('foreign_key') and \
+                    root is not None:
+                return await cls.resolve_children_connection(
+                    connection_type, model, options, root, info, args)
+            elif resolved is None and options.get('keyset'):
+                return await cls.resolve_keyset_connection(
+                    connection_type, model, options, info, args)
+            elif resolved is None:
+                return await cls.resolve_paginated_connection(
+                    connection_type, model, options, info, args)
+
+            _len = len(resolved)
+            connection = connection_from_list_slice(
+                resolved, args, slice_start=0,
+                list_length=_len,
+                list_slice_length=_len,
+                connection_type=connection_type,
+                pageinfo_type=PageInfo,
+                edge_type=connection_type.Edge)
+            connection.iterable = resolved
+            connection.length = _len
+            return connection
+
+    @classmethod
+    async def connection_resolver(cls, resolver, connection_type, model,
+                                  options, root, info, **args):
+        # A coroutine for the executor to schedule as its own task, so
+        # sibling connections read concurrently
+        resolved = resolver(root, info, **args)
+        if inspect.isawaitable(resolved):
+            resolved = await resolved
+        return await cls.resolve_connection(
+            connection_type, model, options, info, args, resolved, root)
 
     def get_resolver(self, parent_resolver):
         return partial(self.connection_resolver,
                        parent_resolver,
                        self.type,
-                       self.model)
+                       self.model,
+                       self.options)
 
 
 class ConnectionField(UnsortedConnectionField):
     def __init__(self, type, *args, **kwargs):
-        if "sort" not in kwargs and issubclass(type, Connection):
+        if "filter" not in kwargs:
+            model = get_field_type_model(type)
+            if model is not None:
+                kwargs["filter"] = filter_argument_for_model(model)
+        elif kwargs["filter"] is None:
+            del kwargs["filter"]
+
+        if "sort" not in kwargs and \
+                issubclass(type, graphene.relay.Connection):
             # Let super class raise if type is not a Connection
             try:
                 model = type.Edge.node._type._meta.model
@@ -95,6 +344,68 @@ class ConnectionField(UnsortedConnectionField):
         super().__init__(type, *args, **kwargs)
 
 
+class StreamField(graphene.Field):
+    """Resolves to an async generator over the matching documents.
+
+    Only works as a field of the subscription root, executed with
+    ``allow_subscriptions=True`` and the ``AsyncioExecutor``. Documents are
+    decoded one cursor batch at a time instead of being collected into a
+    list.
+    """
+
+    def __init__(self, type, *args, batch_size=100, **kwargs):
+        self.batch_size = batch_size
+        super().__init__(type, *args, **kwargs)
+
+    @property
+    def model(self):
+        return self.type._meta.model
+
+    @classmethod
+    def stream_resolver(cls, model, batch_size, root, info, sort=None,
+                        **args):
+        if info.parent_type is not info.schema.get_subscription_type():
+            raise GraphQLError(
+                f'{info.parent_type.name}.{info.field_name} streams '
+                f'documents, it can only be a subscription root field')
+        queryset = get_request_queryset(model, info.context)
+        match = get_query_match(model, info, args)
+        return queryset.stream(match,
+                               get_query_projection(model, info, match),
+                               sort=get_sort(sort),
+                               batch_size=batch_size)
+
+    def get_resolver(self, parent_resolver):
+        return partial(self.stream_resolver, self.model, self.batch_size)
+
+
+class NodesField(graphene.Field):
+    def __init__(self, node=graphene.relay.Node, type=None, **kwargs):
+        assert issubclass(node, graphene.relay.Node), \
+            f'{self.__class__.__name__} can only operate in Nodes'
+        self.node_type = node
+        super().__init__(
+            graphene.List(type or node),
+            description='The objects for the given IDs',
+            ids=graphene.List(graphene.NonNull(graphene.ID), required=True),
+            **kwargs)
+
+    @classmethod
+    async def resolve_nodes(cls, node_type, root, info, ids):
+        async def _get_node(global_id):
+            node = node_type.get_node_from_global_id(info, global_id)
+            if inspect.isawaitable(node):
+                node = await node
+            return node
+
+        # Nodes of the same type are merged into one query by their loader
+        with field_scope(info):
+            return await asyncio.gather(*(_get_node(i) for i in ids))
+
+    def get_resolver(self, parent_resolver):
+        return partial(self.resolve_nodes, self.node_type)
+
+
 def default_connection_field_factory(relationship, registry):
     model = relationship.mapper.entity
     model_type = registry.get_type_for_model(model)
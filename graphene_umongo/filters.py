@@ -0,0 +1,174 @@
+import re
+from collections import OrderedDict
+from functools import lru_cache
+
+import graphene
+import umongo
+from bson import ObjectId
+
+from .converter import convert_umongo_field
+from .registry import get_global_registry
+from .utils import (decode_global_id, get_pk_value, get_reference_model,
+                    iter_fields, _get_umongo_python_world_fields)
+
+FILTER_OPERATORS = OrderedDict((
+    ('eq', '$eq'),
+    ('ne', '$ne'),
+    ('in_', '$in'),
+    ('gt', '$gt'),
+    ('gte', '$gte'),
+    ('lt', '$lt'),
+    ('lte', '$lte'),
+    ('exists', '$exists'),
+))
+
+PREFIX_OPERATOR = 'prefix'
+
+
+def _get_scalar_type(f, registry):
+    if isinstance(f, umongo.fields.ReferenceField):
+        # References are filtered on the referenced id
+        return graphene.ID
+
+    converted = convert_umongo_field(f, registry)
+    if isinstance(converted, graphene.List):
+        converted = converted.of_type
+    elif isinstance(converted, graphene.Scalar):
+        converted = type(converted)
+    else:
+        return None
+    if isinstance(converted, type) and issubclass(converted, graphene.Scalar):
+        return converted
+    return None
+
+
+@lru_cache(maxsize=None)
+def _get_id_paths(model):
+    _paths = {'id'}
+    for path, _, f in iter_fields(model, deep=True):
+        if isinstance(f, (umongo.fields.ObjectIdField,
+                          umongo.fields.ReferenceField)) or \
+                f.attribute == '_id':
+            _paths.add(path)
+    return frozenset(_paths)
+
+
+@lru_cache(maxsize=None)
+def _get_reference_paths(model):
+    return {path: f for path, _, f in iter_fields(model, deep=True)
+            if isinstance(f, umongo.fields.ReferenceField)}
+
+
+def scalar_filter_for_type(scalar, registry=None):
+    if not registry:
+        registry = get_global_registry()
+
+    name = f'{scalar._meta.name}Filter'
+    filter_type = registry.get_filter(name)
+    if not filter_type:
+        fields = OrderedDict()
+        for k in FILTER_OPERATORS:
+            if k == 'exists':
+                fields[k] = graphene.Boolean()
+            elif k == 'in_':
+                fields[k] = graphene.List(graphene.NonNull(scalar), name='in')
+            else:
+                fields[k] = scalar()
+        if issubclass(scalar, (graphene.String, graphene.ID)):
+            fields[PREFIX_OPERATOR] = graphene.String(
+                description='Matches values starting with the given string')
+        filter_type = type(name, (graphene.InputObjectType,), fields)
+        registry.register_filter(name, filter_type)
+    return filter_type
+
+
+def _build_paths_tree(model, registry):
+    tree = OrderedDict(id=graphene.ID)
+    for path, _, f in iter_fields(model, deep=True):
+        scalar = _get_scalar_type(f, registry)
+        if not scalar:
+            continue
+        node = tree
+        *parents, leaf = path.split('.')
+        for p in parents:
+            node = node.setdefault(p, OrderedDict())
+        node[leaf] = scalar
+    return tree
+
+
+def filter_for_model(model, name=None, registry=None):
+    """Builds the ``<Model>Filter`` input type, embedded documents are
+    filtered through nested ``<Model><Path>Filter`` inputs.
+    """
+    if not registry:
+        registry = get_global_registry()
+    if not name:
+        name = f'{model.__name__}Filter'
+
+    def _build(tree, name):
+        _type = registry.get_filter(name)
+        if _type:
+            return _type
+
+        fields = OrderedDict()
+        for k, v in tree.items():
+            if isinstance(v, dict):
+                embedded_name = name[:-len('Filter')] + \
+                    ''.join(p.title() for p in k.split('_')) + 'Filter'
+                fields[k] = _build(v, embedded_name)()
+            else:
+                fields[k] = scalar_filter_for_type(v, registry)()
+        _type = type(name, (graphene.InputObjectType,), fields)
+        registry.register_filter(name, _type)
+        return _type
+
+    return _build(_build_paths_tree(model, registry), name)
+
+
+def filter_argument_for_model(model):
+    return graphene.Argument(filter_for_model(model))
+
+
+def compile_filter(model, value):
+    """Compiles a ``<Model>Filter`` input value into a MongoDB filter."""
+    python_fields = _get_umongo_python_world_fields(model)
+    id_paths = _get_id_paths(model)
+    reference_paths = _get_reference_paths(model)
+    match = {}
+
+    def _to_db_value(path, value):
+        _, value = decode_global_id(value)
+        if path == 'id':
+            return get_pk_value(model, value)
+        if path in reference_paths:
+            return get_pk_value(
+                get_reference_model(model, reference_paths[path]), value)
+        if isinstance(value, str) and ObjectId.is_valid(value):
+            return ObjectId(value)
+        return value
+
+    def _compile(value, prefix):
+        for k, v in value.items():
+            path = f'{prefix}{k}'
+            if v is None:
+                continue
+            if path not in python_fields:
+                _compile(v, f'{path}.')
+                continue
+
+            predicate = {}
+            for op, operand in v.items():
+                if op == PREFIX_OPERATOR:
+                    if operand is not None:
+                        predicate['$regex'] = f'^{re.escape(operand)}'
+                    continue
+                if path in id_paths and op == 'in_' and operand is not None:
+                    operand = [_to_db_value(path, o) for o in operand]
+                elif path in id_paths and op != 'exists':
+                    operand = _to_db_value(path, operand)
+                predicate[FILTER_OPERATORS[op]] = operand
+            if predicate:
+                match[python_fields[path]] = predicate
+
+    _compile(value or {}, '')
+    return match
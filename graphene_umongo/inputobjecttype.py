@@ -1,7 +1,10 @@
 import graphene
-from graphql_relay.node.node import from_global_id
 
 from .converter import convert_model_to_attributes
+from .decoders import compile_input_decoder
+from .loaders import get_loader
+from .registry import get_global_registry
+from .utils import decode_global_id
 
 
 class InputObjectTypeOptions(graphene.types.inputobjecttype.InputObjectTypeOptions):
@@ -66,51 +69,38 @@ class InputObjectType(graphene.InputObjectType):
             _meta=_meta,
             **options)
 
-    def to_dictionary(self, session):
-        """Method to convert Graphene inputs into dictionary"""
-        dictionary = dict(self)
-        try:
-            for key, value in dictionary.items():
-                # Convert GraphQL global id to database id
-                if key[-2:] == 'id':
-                    dictionary[key] = self.from_global_id(value)
-                elif key in self._meta.embedded_inputs:
-                    embedded_input = self._meta.embedded_inputs[key]
-                    model_cls = embedded_input._meta.model
-                    if isinstance(value, list):
-                        dictionary[key] = [
-                            self.to_embedded_model(session, model_cls, **v)
-                            for v in value
-                        ]
-                    else:
-                        dictionary[key] = self.to_embedded_model(
-                            session, model_cls, **value)
-        except Exception as e:
-            session.rollback()
-            raise e
-        return dictionary
+    def to_dictionary(self, session=None, references=None):
+        """Converts the input into a dictionary of database values, global
+        ids included. ``session`` is unused and kept for compatibility.
+        """
+        decode = compile_input_decoder(type(self), self._meta.model)
+        return decode(self, references)
+
+    async def load_references(self, info):
+        """Loads every document referenced by the input, nested inputs
+        included, with one query per referenced collection.
+        """
+        references = {}
+        self.to_dictionary(references=references)
+
+        registry = get_global_registry()
+        loads = {}
+        for model_name, ids in references.items():
+            _type = registry.get_type_for_model_name(model_name)
+            if _type:
+                loader = get_loader(info, _type._meta.model, registry)
+                loads[model_name] = (ids, loader.load_many(ids))
+
+        documents = {}
+        for model_name, (ids, load) in loads.items():
+            _documents = dict(zip(ids, await load))
+            missing = [str(k) for k, v in _documents.items() if v is None]
+            if missing:
+                raise Exception(
+                    f'Unknown {model_name} references: {", ".join(missing)}')
+            documents[model_name] = _documents
+        return documents
 
     @classmethod
-    def from_global_id(self, global_id):
-        try:
-            return from_global_id(global_id)[1]
-        except Exception as _:
-            pass
-        return global_id
-
-    @classmethod
-    def to_embedded_model(self, session, model_cls, **data):
-        model = None
-        model_id = self.from_global_id(data.get('id'))
-        if model_id:
-            model = session.query(model_cls).get(model_id)
-            data['id'] = model_id
-
-        if not model:
-            model = model_cls(**data)
-        else:
-            for field, value in data.items():
-                if getattr(model, field) == value:
-                    continue
-                setattr(model, field, value)
-        return model
+    def from_global_id(cls, global_id):
+        return decode_global_id(global_id)[1]
@@ -0,0 +1,241 @@
+import time
+from collections import defaultdict, namedtuple
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from pymongo import monitoring
+
+from .utils import get_context_state
+
+QueryEvent = namedtuple('QueryEvent', (
+    'field', 'collection', 'operation', 'filter_keys', 'projection_size',
+    'sort', 'limit', 'skip', 'documents', 'bytes', 'started', 'fetch_time',
+    'decode_time'))
+
+FieldEvent = namedtuple('FieldEvent', (
+    'field', 'type_name', 'started', 'duration'))
+
+CommandEvent = namedtuple('CommandEvent', (
+    'field', 'collection', 'command', 'request_id', 'started',
+    'server_time', 'succeeded'))
+
+_FieldScope = namedtuple('_FieldScope', ('path', 'instrumentation'))
+
+_current_field = ContextVar('graphene_umongo_field', default=None)
+_default_instrumentation = None
+
+
+class Instrumentation:
+    """Receives the events of instrumented requests, every hook is a
+    no-op by default.
+    """
+
+    def on_field(self, event):
+        pass
+
+    def on_query(self, event):
+        pass
+
+    def on_command(self, event):
+        pass
+
+
+def set_instrumentation(instrumentation):
+    """Instruments every request not configured with
+    :func:`instrument_request`.
+    """
+    global _default_instrumentation
+    _default_instrumentation = instrumentation
+
+
+def instrument_request(context, instrumentation):
+    get_context_state(context)['instrumentation'] = instrumentation
+
+
+def get_instrumentation(context=None):
+    if context is not None:
+        instrumentation = get_context_state(context).get('instrumentation')
+        if instrumentation is not None:
+            return instrumentation
+    scope = _current_field.get()
+    if scope is not None:
+        return scope.instrumentation
+    return _default_instrumentation
+
+
+def get_current_field():
+    scope = _current_field.get()
+    return scope.path if scope else None
+
+
+def _get_field_path(info):
+    path = getattr(info, 'path', None)
+    if path:
+        return '.'.join(str(p) for p in path)
+    return info.field_name
+
+
+@contextmanager
+def field_scope(info):
+    """Attributes the queries run within the block to the field being
+    resolved and reports how long it took.
+    """
+    instrumentation = get_instrumentation(info.context)
+    if instrumentation is None:
+        yield
+        return
+
+    path = _get_field_path(info)
+    token = _current_field.set(_FieldScope(path, instrumentation))
+    started = time.time()
+    timer = time.perf_counter()
+    try:
+        yield
+    finally:
+        _current_field.reset(token)
+        instrumentation.on_field(FieldEvent(
+            field=path,
+            type_name=str(info.return_type),
+            started=started,
+            duration=time.perf_counter() - timer))
+
+
+class InMemoryCollector(Instrumentation):
+    """Keeps every event in memory, meant for tests, debugging endpoints
+    and per-request summaries.
+    """
+
+    def __init__(self):
+        self.fields = []
+        self.queries = []
+        self.commands = []
+
+    def on_field(self, event):
+        self.fields.append(event)
+
+    def on_query(self, event):
+        self.queries.append(event)
+
+    def on_command(self, event):
+        self.commands.append(event)
+
+    def clear(self):
+        self.fields.clear()
+        self.queries.clear()
+        self.commands.clear()
+
+    def summary(self):
+        """Aggregates queries and commands by field."""
+        _summary = defaultdict(lambda: {
+            'queries': 0, 'documents': 0, 'bytes': 0, 'fetch_time': 0.,
+            'decode_time': 0., 'commands': 0, 'server_time': 0.})
+        for q in self.queries:
+            s = _summary[q.field]
+            s['queries'] += 1
+            s['documents'] += q.documents or 0
+            s['bytes'] += q.bytes or 0
+            s['fetch_time'] += q.fetch_time
+            s['decode_time'] += q.decode_time
+        for c in self.commands:
+            s = _summary[c.field]
+            s['commands'] += 1
+            s['server_time'] += c.server_time
+        return dict(_summary)
+
+
+class TracingAdapter(Instrumentation):
+    """Turns events into finished spans of an OpenTelemetry compatible
+    ``tracer``, one providing ``start_span(name, start_time=...)`` and spans
+    with ``set_attribute`` and ``end(end_time=...)``.
+    """
+
+    def __init__(self, tracer, prefix='graphene_umongo'):
+        self.tracer = tracer
+        self.prefix = prefix
+
+    def _span(self, name, started, duration, attributes):
+        start_time = int(started * 1e9)
+        span = self.tracer.start_span(
+            f'{self.prefix}.{name}', start_time=start_time)
+        for k, v in attributes.items():
+            if v is not None:
+                span.set_attribute(k, v)
+        span.end(end_time=start_time + int(duration * 1e9))
+
+    def on_field(self, event):
+        self._span('field', event.started, event.duration, {
+            'graphql.field.path': event.field,
+            'graphql.field.type': event.type_name,
+        })
+
+    def on_query(self, event):
+        self._span(event.operation, event.started,
+                   event.fetch_time + event.decode_time, {
+                       'graphql.field.path': event.field,
+                       'db.mongodb.collection': event.collection,
+                       'db.filter_keys': ','.join(event.filter_keys),
+                       'db.projection_size': event.projection_size,
+                       'db.sort': str(event.sort) if event.sort else None,
+                       'db.limit': event.limit,
+                       'db.skip': event.skip,
+                       'db.documents': event.documents,
+                       'db.bytes': event.bytes,
+                       'db.decode_time': event.decode_time,
+                   })
+
+    def on_command(self, event):
+        self._span(f'command.{event.command}', event.started,
+                   event.server_time, {
+                       'graphql.field.path': event.field,
+                       'db.mongodb.collection': event.collection,
+                       'db.success': event.succeeded,
+                   })
+
+
+class CommandListenerBridge(monitoring.CommandListener):
+    """Reports the commands pymongo sends to the field that caused them.
+
+    Register it on the client, ``AsyncIOMotorClient(event_listeners=[...])``.
+    Motor copies context variables into its executor, so the field being
+    resolved is still known when pymongo publishes the event.
+    """
+
+    def __init__(self, instrumentation=None):
+        self.instrumentation = instrumentation
+        self._pending = {}
+
+    def started(self, event):
+        scope = _current_field.get()
+        instrumentation = self.instrumentation or (
+            scope.instrumentation if scope else _default_instrumentation)
+        if instrumentation is None:
+            return
+        collection = event.command.get(event.command_name)
+        if not isinstance(collection, str):
+            # getMore names the cursor first and the collection after
+            collection = event.command.get('collection')
+        self._pending[(event.connection_id, event.request_id)] = (
+            instrumentation, scope.path if scope else None,
+            collection if isinstance(collection, str) else None,
+            time.time())
+
+    def _finished(self, event, succeeded):
+        pending = self._pending.pop(
+            (event.connection_id, event.request_id), None)
+        if pending is None:
+            return
+        instrumentation, field, collection, started = pending
+        instrumentation.on_command(CommandEvent(
+            field=field,
+            collection=collection,
+            command=event.command_name,
+            request_id=event.request_id,
+            started=started,
+            server_time=event.duration_micros / 1e6,
+            succeeded=succeeded))
+
+    def succeeded(self, event):
+        self._finished(event, True)
+
+    def failed(self, event):
+        self._finished(event, False)
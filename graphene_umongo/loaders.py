@@ -0,0 +1,165 @@
+import asyncio
+
+from bson import json_util
+
+from .querysets import get_request_queryset
+from .utils import get_context_state
+
+
+class DocumentLoader:
+    """Batches every ``load`` issued during one loop iteration into a single
+    ``{key: {'$in': [...]}}`` query and caches the results for the request.
+    """
+
+    def __init__(self, queryset, key='_id'):
+        self.queryset = queryset
+        self.key = key
+        self._futures = {}
+        self._queue = []
+
+    def get_document_key(self, document):
+        if document is None:
+            return None
+        if isinstance(document, dict):
+            return document.get(self.key)
+        return getattr(document, 'id' if self.key == '_id' else self.key, None)
+
+    def load(self, key):
+        future = self._futures.get(key)
+        if future is None:
+            loop = asyncio.get_event_loop()
+            future = loop.create_future()
+            self._futures[key] = future
+            if not self._queue:
+                loop.call_soon(lambda: asyncio.ensure_future(self.dispatch()))
+            self._queue.append((key, future))
+        return future
+
+    def load_many(self, keys):
+        return asyncio.gather(*(self.load(k) for k in keys))
+
+    def prime(self, key, document):
+        if key not in self._futures:
+            future = asyncio.get_event_loop().create_future()
+            future.set_result(document)
+            self._futures[key] = future
+
+    def clear(self, key=None):
+        if key is None:
+            self._futures.clear()
+        else:
+            self._futures.pop(key, None)
+
+    async def dispatch(self):
+        queue, self._queue = self._queue, []
+
+        cache = self.queryset.document_cache if self.key == '_id' else None
+        if cache is not None:
+            projection = self.queryset.get_projection({})
+
+        # A single key goes through find_one, which consults the cache itself
+        if cache is not None and len(queue) > 1:
+            for key, future in queue:
+                document = cache.get(key, projection)
+                if document is not None and not future.done():
+                    future.set_result(document)
+            queue = [(k, f) for k, f in queue if not f.done()]
+
+        if not queue:
+            return
+
+        batched = len(queue) > 1
+        if cache is not None and batched:
+            generation = cache.generation()
+        try:
+            if not batched:
+                documents = [await self.queryset.find_one(
+                    {self.key: queue[0][0]})]
+            else:
+                documents = await self.queryset.find(
+                    {self.key: {'$in': [k for k, _ in queue]}})
+        except Exception as e:
+            for _, future in queue:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        _documents = {self.get_document_key(d): d for d in documents}
+        if cache is not None and batched:
+            for key, document in _documents.items():
+                cache.set(key, projection, document, generation)
+        for key, future in queue:
+            if not future.done():
+                future.set_result(_documents.get(key))
+
+
+class ChildrenLoader(DocumentLoader):
+    """Batches the child connection reads of every parent loaded during
+    one loop iteration into a single grouped aggregation, ``load`` resolves
+    to the ``(documents, count)`` of one parent.
+    """
+
+    def __init__(self, queryset, key, match=None, projections=None,
+                 sort=None, skip=0, limit=0, count_limit=None):
+        super().__init__(queryset, key)
+        self.match = match or {}
+        self.projections = projections or {}
+        self.sort = sort
+        self.skip = skip
+        self.limit = limit
+        self.count_limit = count_limit
+
+    async def dispatch(self):
+        queue, self._queue = self._queue, []
+        if not queue:
+            return
+
+        try:
+            groups = await self.queryset.find_grouped(
+                self.key, [k for k, _ in queue],
+                match=self.match,
+                projections=self.projections,
+                limit=self.limit,
+                skip=self.skip,
+                sort=self.sort,
+                count_limit=self.count_limit)
+        except Exception as e:
+            for _, future in queue:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for key, future in queue:
+            if not future.done():
+                future.set_result(groups.get(key, ([], 0)))
+
+
+def get_children_loader(info, model, key, match, projections, sort=None,
+                        skip=0, limit=0, count_limit=None, registry=None,
+                        read_preference=None):
+    queryset = get_request_queryset(model, info.context, registry,
+                                    read_preference)
+    assert queryset, f'No queryset registered for {model.__name__}'
+
+    loaders = get_context_state(info.context).setdefault(
+        'children_loaders', {})
+    loader_key = (queryset.collection_name, key, json_util.dumps(
+        [match, projections, sort, skip, limit, count_limit,
+         getattr(read_preference, 'document', None)], sort_keys=True))
+    loader = loaders.get(loader_key)
+    if not loader:
+        loader = loaders[loader_key] = ChildrenLoader(
+            queryset, key, match, projections, sort, skip, limit,
+            count_limit)
+    return loader
+
+
+def get_loader(info, model, registry=None):
+    queryset = get_request_queryset(model, info.context, registry)
+    assert queryset, f'No queryset registered for {model.__name__}'
+
+    loaders = get_context_state(info.context).setdefault('loaders', {})
+    loader = loaders.get(queryset.collection_name)
+    if not loader:
+        loader = loaders[queryset.collection_name] = DocumentLoader(queryset)
+    return loader
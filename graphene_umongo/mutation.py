@@ -1,5 +1,19 @@
+import asyncio
+
 import graphene
+from bson import ObjectId
+from graphql import GraphQLError
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.read_preferences import Primary
 from sqlalchemy.inspection import inspect
+from umongo.fields import ObjectIdField
+
+from .querysets import get_request_queryset, invalidate_request_cache
+from .utils import (decode_global_id, get_pk_value, get_query_projection,
+                    _get_pk_field,
+                    _get_umongo_discriminator_paths,
+                    _get_umongo_mongo_world_fields,
+                    _get_umongo_python_world_fields)
 
 
 class MutationOptions(graphene.types.mutation.MutationOptions):
@@ -34,6 +48,12 @@ class Mutation(graphene.Mutation):
         assert output, f'no output for {cls}'
         new_record = cls.upsert(
             info.context, output._meta.model, db_session, **data)
+        queryset = output._meta.registry.get_queryset(output._meta.model)
+        if queryset and data.get('id'):
+            queryset.invalidate(
+                get_pk_value(output._meta.model, data.get('id')))
+        if queryset:
+            invalidate_request_cache(info.context, queryset.collection_name)
         return output(**new_record.as_dict())
 
     @classmethod
@@ -57,3 +77,321 @@ class Mutation(graphene.Mutation):
             session.commit()
 
         return model
+
+
+def _drop_none(value):
+    if isinstance(value, dict):
+        return {k: _drop_none(v) for k, v in value.items() if v is not None}
+    if isinstance(value, list):
+        return [_drop_none(v) for v in value]
+    return value
+
+
+def _to_mongo_path(model, path):
+    python_fields = _get_umongo_python_world_fields(model)
+    if path in python_fields:
+        return python_fields[path]
+    depth = path.count('.') + 1
+    for k, v in python_fields.items():
+        if k.startswith(f'{path}.'):
+            return '.'.join(v.split('.')[:depth])
+    return path
+
+
+def _split_defaults(model, data, document):
+    """Splits the Mongo ``document`` built from ``data`` into the top level
+    fields ``data`` holds and the defaults umongo filled in.
+    """
+    sent = {_to_mongo_path(model, k) for k in data}
+    _document, defaults = {}, {}
+    for k, v in document.items():
+        (_document if k in sent else defaults)[k] = v
+    return _document, defaults
+
+
+class DocumentMutationOptions(graphene.types.mutation.MutationOptions):
+    model = None
+    node_type = None
+    ordered = True
+    push_fields = ()
+
+
+class DocumentMutation(graphene.Mutation):
+    """Upserts one document through the Motor collection of the output
+    type's model, the stored document is read back and decoded like any
+    query result.
+
+    The input argument is named ``input``::
+
+        class UpsertBook(DocumentMutation):
+            class Arguments:
+                input = BookInput(required=True)
+
+            Output = BookType
+    """
+
+    class Meta:
+        abstract = True
+
+    @classmethod
+    def __init_subclass_with_meta__(cls,
+                                    output=None,
+                                    ordered=True,
+                                    _meta=None,
+                                    **options):
+        if not _meta:
+            _meta = DocumentMutationOptions(cls)
+
+        output = output or getattr(cls, 'Output', None)
+        node_type = output.of_type \
+            if isinstance(output, graphene.List) else output
+        assert node_type and hasattr(node_type._meta, 'model'), \
+            f'{cls.__name__} needs an ObjectType or a List of ObjectType ' \
+            f'as output, received "{output}"'
+
+        _meta.model = node_type._meta.model
+        _meta.node_type = node_type
+        _meta.ordered = ordered
+
+        super().__init_subclass_with_meta__(
+            output=output, _meta=_meta, **options)
+
+    @classmethod
+    def get_queryset(cls):
+        node_type = cls._meta.node_type
+        return node_type._meta.registry.get_queryset(cls._meta.model)
+
+    @classmethod
+    def get_primary_queryset(cls):
+        # Documents just written may not have reached the secondaries
+        return cls.get_queryset().with_read_preference(Primary())
+
+    @classmethod
+    def get_pk(cls, data):
+        model = cls._meta.model
+        _id = data.get('id')
+        if _id is None:
+            # Only ObjectId primary keys can be generated
+            pk_field = _get_pk_field(model)
+            if pk_field is not None and \
+                    not isinstance(pk_field, ObjectIdField):
+                raise GraphQLError(
+                    f'An id is required to write a {model.__name__}')
+            return ObjectId()
+        return get_pk_value(model, decode_global_id(_id)[1])
+
+    @staticmethod
+    def to_dictionary(data):
+        if hasattr(data, 'to_dictionary'):
+            return data.to_dictionary()
+        return dict(data)
+
+    @classmethod
+    def to_mongo(cls, data):
+        """Validates ``data`` with the umongo model, returns the primary key,
+        the Mongo fields to store under it and the defaults only written
+        when the document is inserted.
+
+        Inputs without an id always insert and must hold every required
+        field.
+        """
+        data = _drop_none(cls.to_dictionary(data))
+        insert = data.get('id') is None
+        _id = cls.get_pk(data)
+        data.pop('id', None)
+        model = cls._meta.model(**data)
+        if insert:
+            model.required_validate()
+        document = model.to_mongo()
+        document.pop('_id', None)
+        document, defaults = _split_defaults(cls._meta.model, data, document)
+        return _id, document, defaults
+
+    @classmethod
+    def get_update(cls, _id, document, defaults=None):
+        # Servers before MongoDB 5.0 reject empty update operators
+        update = {}
+        if document:
+            update['$set'] = document
+        if defaults:
+            update['$setOnInsert'] = defaults
+        return update or {'$setOnInsert': {'_id': _id}}
+
+    @classmethod
+    async def load_references(cls, info, inputs):
+        """Fails before writing when ``inputs`` reference missing documents,
+        every referenced collection is read once for all of them.
+        """
+        await asyncio.gather(*(
+            i.load_references(info) for i in inputs
+            if hasattr(i, 'load_references')))
+
+    @classmethod
+    def invalidate(cls, info, ids):
+        queryset = cls.get_queryset()
+        for _id in ids:
+            queryset.invalidate(_id)
+        invalidate_request_cache(info.context, queryset.collection_name)
+
+    @classmethod
+    async def read(cls, info, ids):
+        model = cls._meta.model
+        queryset = get_request_queryset(
+            model, info.context, cls._meta.node_type._meta.registry,
+            read_preference=Primary())
+        match = {'_id': {'$in': ids}}
+        documents = await queryset.find(
+            match, get_query_projection(model, info, match))
+        _documents = {getattr(d, 'id', None): d for d in documents}
+        return [_documents.get(_id) for _id in ids]
+
+    @classmethod
+    async def mutate(cls, root, info, input):
+        _id, document, defaults = cls.to_mongo(input)
+        await cls.load_references(info, [input])
+        await cls.get_queryset().collection.update_one(
+            {'_id': _id}, cls.get_update(_id, document, defaults),
+            upsert=True)
+
+        cls.invalidate(info, [_id])
+        documents = await cls.read(info, [_id])
+        return documents[0]
+
+
+class BulkDocumentMutation(DocumentMutation):
+    """Upserts a list of documents with a single ``bulk_write``.
+
+    The input argument is named ``inputs`` and the output is a ``List`` of
+    the node type. Set ``ordered = False`` in ``Meta`` to let MongoDB apply
+    the remaining writes after a failure.
+    """
+
+    class Meta:
+        abstract = True
+
+    @classmethod
+    async def mutate(cls, root, info, inputs):
+        writes = [cls.to_mongo(i) for i in inputs]
+        if not writes:
+            return []
+        await cls.load_references(info, inputs)
+
+        try:
+            await cls.get_queryset().collection.bulk_write([
+                UpdateOne({'_id': _id},
+                          cls.get_update(_id, document, defaults),
+                          upsert=True)
+                for _id, document, defaults in writes
+            ], ordered=cls._meta.ordered)
+        finally:
+            # Unordered writes may have partially succeeded
+            cls.invalidate(info, [_id for _id, _, _ in writes])
+        return await cls.read(info, [_id for _id, _, _ in writes])
+
+
+class UpdateDocumentMutation(DocumentMutation):
+    """Applies the fields present in ``input`` to an existing document with
+    one ``find_one_and_update``, without reading it first.
+
+    Embedded inputs update their dotted paths, explicit ``null`` values
+    unset them and the list fields named in ``Meta.push_fields`` are
+    appended to instead of replaced. The updated document is only
+    projected on the fields the output selection needs.
+    """
+
+    class Meta:
+        abstract = True
+
+    @classmethod
+    def __init_subclass_with_meta__(cls, push_fields=(), _meta=None,
+                                    **options):
+        if not _meta:
+            _meta = DocumentMutationOptions(cls)
+        _meta.push_fields = frozenset(push_fields)
+        super().__init_subclass_with_meta__(_meta=_meta, **options)
+
+    @classmethod
+    def compile_update(cls, data):
+        model = cls._meta.model
+        python_fields = _get_umongo_python_world_fields(model)
+        mongo_fields = _get_umongo_mongo_world_fields(model)
+        discriminators = _get_umongo_discriminator_paths(model)
+
+        def _is_embedded(path, fields):
+            return path not in discriminators and \
+                any(k.startswith(f'{path}.') for k in fields)
+
+        def _iter_unset(value, prefix):
+            for k, v in value.items():
+                path = f'{prefix}{k}'
+                if v is None:
+                    yield _to_mongo_path(model, path)
+                elif isinstance(v, dict) and \
+                        _is_embedded(path, python_fields):
+                    yield from _iter_unset(v, f'{path}.')
+
+        def _iter_sent(value, prefix):
+            for k, v in value.items():
+                path = f'{prefix}{k}'
+                if isinstance(v, dict) and _is_embedded(path, python_fields):
+                    yield from _iter_sent(v, f'{path}.')
+                else:
+                    yield _to_mongo_path(model, path)
+
+        def _iter_set(value, prefix):
+            for k, v in value.items():
+                path = f'{prefix}{k}'
+                if isinstance(v, dict) and _is_embedded(path, mongo_fields):
+                    yield from _iter_set(v, f'{path}.')
+                else:
+                    yield path, v
+
+        data = cls.to_dictionary(data)
+        data.pop('id', None)
+        _unset = {k: '' for k in _iter_unset(data, '')}
+        data = _drop_none(data)
+        # Only what the client sent, umongo fills in defaults
+        sent = set(_iter_sent(data, ''))
+        document = model(**data).to_mongo()
+
+        _push = {}
+        for k in cls._meta.push_fields:
+            mongo_field = _to_mongo_path(model, k)
+            if mongo_field in sent and document.get(mongo_field):
+                _push[mongo_field] = {'$each': document.pop(mongo_field)}
+
+        update = {}
+        _set = {k: v for k, v in _iter_set(document, '')
+                if k in sent and k not in _unset}
+        for k, v in (('$set', _set), ('$unset', _unset), ('$push', _push)):
+            if v:
+                update[k] = v
+        return update
+
+    @classmethod
+    async def mutate(cls, root, info, input):
+        model = cls._meta.model
+        if input.get('id') is None:
+            raise Exception(f'An id is required to update a {model.__name__}')
+
+        _id = cls.get_pk(input)
+        update = cls.compile_update(input)
+        await cls.load_references(info, [input])
+        queryset = cls.get_queryset()
+        match = {'_id': _id}
+        projection = queryset.get_projection(
+            get_query_projection(model, info, match))
+
+        if update:
+            document = await queryset.collection.find_one_and_update(
+                match, update,
+                projection=projection,
+                return_document=ReturnDocument.AFTER)
+            cls.invalidate(info, [_id])
+        else:
+            document = await cls.get_primary_queryset().collection.find_one(
+                match, projection=projection)
+
+        if queryset.documents_converter:
+            return queryset.documents_converter(document)
+        return document
@@ -1,21 +1,25 @@
 import graphene
 import umongo
 
-from .converter import (get_attributes_fields, convert_umongo_model,
-                        convert_model_to_attributes)
-from .querysets import FindQueryset, init_queryset
+from .converter import get_attributes_fields, convert_model_to_attributes
+from .decoders import compile_document_decoder
+from .fields import Connection
+from .instrumentation import field_scope
+from .loaders import get_loader
+from .planner import ALLOW, IndexPlanner
+from .querysets import (FindQueryset, get_read_preference,
+                        get_request_queryset, init_queryset)
 from .registry import Registry, get_global_registry
-from .utils import (get_query, iter_fields, _get_embedded_field_model_class,
-                    _iter_umongo_model_offspring)
+from .utils import get_pk_value, get_query
 
 
 class ObjectTypeOptions(graphene.types.objecttype.ObjectTypeOptions):
     model = None
     registry = None
     connection = None
-    field_names_convertor = None
-    field_types_convertor = None
     attributes = None
+    decoder = None
+    cost_weight = 1
     id = None
 
 
@@ -26,6 +30,12 @@ class ObjectType(graphene.ObjectType):
         model=None,
         attributes=None,
         queryset=None,
+        document_cache=None,
+        index_policy=None,
+        sort_indexed_only=False,
+        cost_weight=1,
+        read_preference=None,
+        max_staleness_seconds=None,
         registry=None,
         skip_registry=False,
         only_fields=(),
@@ -48,13 +58,22 @@ class ObjectType(graphene.ObjectType):
             f'{cls.__name__} needs to be an instance of Registry, received ' \
             f'\'{registry}\'.'
 
-        if not attributes:
-            attributes = convert_model_to_attributes(model)
+        # Generated attributes already hold the converted model fields
+        generated_attributes = not attributes
+        if generated_attributes:
+            attributes = convert_model_to_attributes(model, registry=registry)
 
         if not queryset:
             queryset = FindQueryset
 
-        queryset = init_queryset(queryset, model, cls)
+        queryset = init_queryset(queryset, model, cls, document_cache)
+        if index_policy or sort_indexed_only:
+            queryset.planner = IndexPlanner(
+                model,
+                policy=index_policy or ALLOW,
+                sort_indexed_only=sort_indexed_only)
+        queryset.read_preference = get_read_preference(
+            read_preference, max_staleness_seconds)
         registry.register_queryset(model, queryset)
         assert registry.get_queryset(model) == queryset
 
@@ -67,7 +86,7 @@ class ObjectType(graphene.ObjectType):
         if use_connection and not connection:
             # We create the connection automatically
             if not connection_class:
-                connection_class = graphene.relay.Connection
+                connection_class = Connection
             connection = connection_class.create_type(
                 f'{cls.__name__}Connection', node=cls
             )
@@ -84,8 +103,7 @@ class ObjectType(graphene.ObjectType):
         _meta.registry = registry
         _meta.connection = connection
         _meta.attributes = attributes
-        _meta.field_names_convertor = cls._get_field_names_convertor(model)
-        _meta.field_types_convertor = cls._get_field_types_convertor(model)
+        _meta.cost_weight = cost_weight
         _meta.id = id or "id"
 
         _fields = {
@@ -93,13 +111,19 @@ class ObjectType(graphene.ObjectType):
             if (not callable(getattr(attributes, n)) and
                 not n.startswith('__'))
         }
-        _fields.update(get_attributes_fields(model, registry))
+        if not generated_attributes:
+            _fields.update(get_attributes_fields(model, registry))
 
         if _meta.fields:
             _meta.fields.update(_fields)
         else:
             _meta.fields = _fields
 
+        _meta.decoder = compile_document_decoder(
+            cls, model, registry,
+            ids='id' in _meta.fields or any(
+                'id' in i._meta.fields for i in interfaces))
+
         super(ObjectType, cls).__init_subclass_with_meta__(
             _meta=_meta, interfaces=interfaces, **options
         )
@@ -116,91 +140,18 @@ class ObjectType(graphene.ObjectType):
     @classmethod
     async def get_query(cls, info):
         model = cls._meta.model
-        reg = get_global_registry()
-        queryset = reg.get_queryset(model)
-        return await get_query(model, queryset.find_one, info)
+        queryset = get_request_queryset(model, info.context,
+                                        cls._meta.registry)
+        with field_scope(info):
+            return await get_query(model, queryset.find_one, info)
 
     @classmethod
     async def get_node(cls, info, id):
-        return await cls.get_query(info)
-
-    @classmethod
-    async def postprocess_db_response(cls, document):
-        if not document:
-            return None
-
-        def _convert_embed_doc(document, converter):
-            assert isinstance(converter, list)
-            result = document
-            for i in converter:
-                try:
-                    result = i(**result)
-                except Exception as _:
-                    continue
-                else:
-                    break
-            return result
-
-        def _convert_document(document, converter):
-            fields = {}
-            for k, v in document.items():
-                conv = converter.get(k)
-                if isinstance(conv, str):
-                    fields[conv] = v
-                elif isinstance(conv, dict):
-                    embed_conv = cls._meta.field_types_convertor.get(k)
-                    assert embed_conv
-                    if isinstance(v, list):
-                        fields[k] = [
-                            _convert_embed_doc(
-                                _convert_document(d, conv), embed_conv)
-                            for d in v]
-                    else:
-                        fields[k] = _convert_embed_doc(
-                            _convert_document(v, conv), embed_conv)
-            return fields
-
-        return cls(**_convert_document(
-            document, cls._meta.field_names_convertor))
-
-    @classmethod
-    def _get_field_names_convertor(cls, model):
-        def _from_mongo_world(i):
-            if i == '_id':
-                return 'id'
-            return i
-
-        def _collect_fields(model, registry):
-            _result = {}
-            for _, n, f in iter_fields(model):
-                mongo_field = f.attribute or n
-                embedded_doc = _get_embedded_field_model_class(f)
-                if embedded_doc:
-                    _embed_fields = _collect_fields(embedded_doc, registry)
-                    for o in _iter_umongo_model_offspring(embedded_doc):
-                        _embed_fields.update(_collect_fields(o, registry))
-                    _result[mongo_field] = _embed_fields
-                else:
-                    _result[mongo_field] = _from_mongo_world(mongo_field)
-            return _result
-
-        _conv = {'_id': 'id'}
-        _conv.update(_collect_fields(model, get_global_registry()))
-        return _conv
+        model = cls._meta.model
+        loader = get_loader(info, model, cls._meta.registry)
+        with field_scope(info):
+            return await loader.load(get_pk_value(model, id))
 
     @classmethod
-    def _get_field_types_convertor(cls, model):
-        def _collect_converters(model, registry):
-            _result = {}
-            for _, n, f in iter_fields(model):
-                embedded_doc = _get_embedded_field_model_class(f)
-                if embedded_doc:
-                    _result[n] = [
-                        convert_umongo_model(o, registry)
-                        for o in _iter_umongo_model_offspring(embedded_doc)
-                    ]
-            return _result
-
-        _conv = {}
-        _conv.update(_collect_converters(model, get_global_registry()))
-        return _conv
+    def postprocess_db_response(cls, document):
+        return cls._meta.decoder(document)
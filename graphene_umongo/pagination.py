@@ -0,0 +1,189 @@
+import pymongo
+from bson import json_util
+from graphene.relay.connection import PageInfo
+from graphql import GraphQLError
+from graphql_relay.connection.arrayconnection import (get_offset_with_default,
+                                                      offset_to_cursor)
+from graphql_relay.utils import base64, unbase64
+
+from .utils import _get_umongo_mongo_world_fields, get_context_state
+
+
+def set_default_page_size(context, page_size):
+    get_context_state(context)['default_page_size'] = page_size
+
+
+def apply_default_page_size(args, context):
+    """Gives a connection read without ``first`` nor ``last`` the default
+    page size of its request, if any.
+    """
+    page_size = get_context_state(context).get('default_page_size')
+    if page_size is None or isinstance(args.get('first'), int) or \
+            isinstance(args.get('last'), int):
+        return args
+    return dict(args, first=page_size)
+
+
+def needs_count(args):
+    # Backward pages end at the count when ``before`` is missing or, for a
+    # stale cursor, past the last document
+    return isinstance(args.get('last'), int)
+
+
+def get_window(args, count=None):
+    """Translates Relay arguments into an offset window ``(start, end)``.
+
+    ``end`` is ``None`` when the window is open ended, ``count`` is
+    required to resolve ``last`` and clamps ``before`` to the documents.
+    """
+    first = args.get('first')
+    last = args.get('last')
+    after_offset = get_offset_with_default(args.get('after'), -1)
+    before_offset = get_offset_with_default(args.get('before'), count)
+
+    start = max(after_offset + 1, 0)
+    end = before_offset
+    if end is not None and count is not None:
+        end = min(end, count)
+
+    if isinstance(first, int):
+        if first < 0:
+            raise GraphQLError(
+                'Argument "first" must be a non-negative integer')
+        end = start + first if end is None else min(end, start + first)
+
+    if isinstance(last, int):
+        if last < 0:
+            raise GraphQLError(
+                'Argument "last" must be a non-negative integer')
+        assert end is not None, \
+            'Argument "last" requires "before" or a documents count'
+        start = max(start, end - last)
+
+    if end is not None:
+        end = max(start, end)
+    return start, end
+
+
+def get_window_limit(start, end):
+    # One extra document tells us whether there is a next page
+    if end is None:
+        return 0
+    return end - start + 1
+
+
+def connection_from_page(page, args, start, end,
+                         connection_type,
+                         edge_type,
+                         pageinfo_type=PageInfo):
+    first = args.get('first')
+    last = args.get('last')
+    lower_bound = get_offset_with_default(args.get('after'), -1) + 1
+    upper_bound = get_offset_with_default(args.get('before'), None)
+
+    if end is None:
+        nodes, has_more = page, False
+    else:
+        nodes, has_more = page[:end - start], len(page) > end - start
+
+    edges = [
+        edge_type(node=node, cursor=offset_to_cursor(start + i))
+        for i, node in enumerate(nodes)
+    ]
+
+    has_next_page = isinstance(first, int) and has_more and \
+        (upper_bound is None or end < upper_bound)
+    has_previous_page = isinstance(last, int) and start > lower_bound
+
+    return connection_type(
+        edges=edges,
+        page_info=pageinfo_type(
+            start_cursor=edges[0].cursor if edges else None,
+            end_cursor=edges[-1].cursor if edges else None,
+            has_previous_page=has_previous_page,
+            has_next_page=has_next_page
+        )
+    )
+
+
+KEYSET_PREFIX = 'keyset:'
+
+
+def keyset_to_cursor(values):
+    return base64(KEYSET_PREFIX + json_util.dumps(values))
+
+
+def cursor_to_keyset(cursor, sort):
+    if not cursor:
+        return None
+    try:
+        _cursor = unbase64(cursor)
+    except Exception:
+        _cursor = ''
+    if not _cursor.startswith(KEYSET_PREFIX):
+        raise Exception(f'Invalid keyset cursor "{cursor}"')
+    values = json_util.loads(_cursor[len(KEYSET_PREFIX):])
+    if not isinstance(values, list) or len(values) != len(sort):
+        raise Exception(f'Cursor "{cursor}" does not match the sort order')
+    return values
+
+
+def get_keyset_sort(sort):
+    _sort = list(sort or [])
+    if not any(k == '_id' for k, _ in _sort):
+        direction = _sort[-1][1] if _sort else pymongo.ASCENDING
+        _sort.append(('_id', direction))
+    return _sort
+
+
+def reverse_sort(sort):
+    return [(k, -d) for k, d in sort]
+
+
+def get_node_keyset(node, model, sort):
+    mongo_fields = _get_umongo_mongo_world_fields(model)
+
+    def _get_value(node, path):
+        for part in path.split('.'):
+            if node is None:
+                break
+            if isinstance(node, dict):
+                node = node.get(part)
+            else:
+                node = getattr(node, part, None)
+        return node
+
+    return [_get_value(node, mongo_fields.get(k, k)) for k, _ in sort]
+
+
+def connection_from_keyset_page(page, args, model, sort,
+                                connection_type,
+                                edge_type,
+                                pageinfo_type=PageInfo):
+    first = args.get('first')
+    last = args.get('last')
+
+    nodes, has_more = page, False
+    if isinstance(last, int):
+        has_more = len(page) > last
+        nodes = list(reversed(page[:last]))
+    elif isinstance(first, int):
+        has_more = len(page) > first
+        nodes = page[:first]
+
+    edges = [
+        edge_type(node=node,
+                  cursor=keyset_to_cursor(get_node_keyset(node, model, sort)))
+        for node in nodes
+    ]
+
+    return connection_type(
+        edges=edges,
+        page_info=pageinfo_type(
+            start_cursor=edges[0].cursor if edges else None,
+            end_cursor=edges[-1].cursor if edges else None,
+            has_previous_page=isinstance(last, int) and has_more,
+            has_next_page=not isinstance(last, int) and
+            isinstance(first, int) and has_more
+        )
+    )
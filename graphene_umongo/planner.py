@@ -0,0 +1,127 @@
+import logging
+
+from graphql import GraphQLError
+
+logger = logging.getLogger(__name__)
+
+INDEXED = 'indexed'
+PREFIX_INDEXED = 'prefix'
+COLLECTION_SCAN = 'scan'
+
+ALLOW = 'allow'
+WARN = 'warn'
+REJECT = 'reject'
+POLICIES = (ALLOW, WARN, REJECT)
+
+
+def iter_match_fields(match):
+    for k, v in match.items():
+        if k in ('$and', '$or', '$nor'):
+            for m in v:
+                yield from iter_match_fields(m)
+        elif not k.startswith('$'):
+            yield k
+
+
+class IndexPlanner:
+    """Classifies filters and sorts against the indexes of a collection.
+
+    Indexes come from umongo ``Meta.indexes`` when the schema is built and
+    can be refreshed from the server with :meth:`load`. Queries that can't
+    use an index are allowed, logged or rejected according to ``policy``.
+    """
+
+    def __init__(self, model, policy=WARN, sort_indexed_only=False,
+                 indexes=None):
+        assert policy in POLICIES, \
+            f'Index policy must be one of {POLICIES}, received "{policy}"'
+        self.model = model
+        self.policy = policy
+        self.sort_indexed_only = sort_indexed_only
+        self.indexes = [(('_id', 1),)]
+        if indexes is None:
+            indexes = self.get_model_indexes(model)
+        self.add_indexes(indexes)
+
+    @staticmethod
+    def get_model_indexes(model):
+        opts = getattr(model, 'opts', None)
+        for index in getattr(opts, 'indexes', None) or ():
+            document = getattr(index, 'document', index)
+            yield list(document['key'].items())
+
+    def add_indexes(self, indexes):
+        for keys in indexes:
+            keys = tuple((k, d) for k, d in keys)
+            if keys and keys not in self.indexes:
+                self.indexes.append(keys)
+
+    async def load(self, collection):
+        information = await collection.index_information()
+        self.add_indexes(i['key'] for i in information.values())
+        return self
+
+    @property
+    def sortable_fields(self):
+        return {keys[0][0] for keys in self.indexes}
+
+    @staticmethod
+    def _sort_matches(keys, sort):
+        if len(sort) > len(keys):
+            return False
+        # A compound index serves its sort order and the exact reverse
+        same = all(k == s and d == sd for (k, d), (s, sd) in zip(keys, sort))
+        reverse = all(k == s and d == -sd
+                      for (k, d), (s, sd) in zip(keys, sort))
+        return same or reverse
+
+    def classify(self, match=None, sort=None):
+        fields = set(iter_match_fields(match or {}))
+        sort = list(sort or ())
+        if not fields and not sort:
+            return INDEXED
+
+        classification = COLLECTION_SCAN
+        for keys in self.indexes:
+            prefix = 0
+            for k, _ in keys:
+                if k not in fields:
+                    break
+                prefix += 1
+
+            # Equality/range fields first, then the sort keys
+            serves_filter = prefix == len(fields)
+            serves_sort = not sort or self._sort_matches(keys[prefix:], sort)
+            if serves_filter and serves_sort:
+                return INDEXED
+            # Walking an index only for its order still reads every document
+            if prefix:
+                classification = PREFIX_INDEXED
+        return classification
+
+    def check(self, collection_name, match=None, sort=None):
+        classification = self.classify(match, sort)
+        if classification == INDEXED or self.policy == ALLOW:
+            return classification
+
+        message = f'Query on "{collection_name}" is not fully indexed ' \
+            f'({classification}): filter on ' \
+            f'{sorted(set(iter_match_fields(match or {})))}, ' \
+            f'sort {list(sort or ())}'
+        if classification == COLLECTION_SCAN and self.policy == REJECT:
+            raise GraphQLError(message)
+        logger.warning(message)
+        return classification
+
+
+async def load_index_information(registry=None):
+    """Refreshes every planner of ``registry`` from the live collections,
+    meant to be awaited once at application startup.
+    """
+    from .registry import get_global_registry
+
+    if not registry:
+        registry = get_global_registry()
+    for queryset in registry.get_querysets():
+        if queryset.planner is not None:
+            await queryset.planner.load(queryset.collection)
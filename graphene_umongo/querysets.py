@@ -1,10 +1,28 @@
+import asyncio
+import copy
+import time
+from collections import OrderedDict
+
+import pymongo
 import umongo
+from pymongo.errors import ExecutionTimeout
+from pymongo.read_preferences import (Nearest, Primary, PrimaryPreferred,
+                                      Secondary, SecondaryPreferred)
+from bson import BSON, json_util
 from graphql.pyutils.cached_property import cached_property
 
-from .utils import iter_fields, _get_umongo_mongo_world_fields
+from .deadline import DeadlineExceeded, get_remaining_time
+from .instrumentation import (QueryEvent, get_current_field,
+                              get_instrumentation)
+from .planner import iter_match_fields
+from .registry import get_global_registry
+from .utils import (DISCRIMINATOR_FIELD, get_context_state, iter_fields,
+                    _get_umongo_discriminator_paths,
+                    _get_umongo_mongo_world_fields,
+                    _get_umongo_reference_paths)
 
 
-def init_queryset(queryset_cls, model, schema_cls):
+def init_queryset(queryset_cls, model, schema_cls, document_cache=None):
     def _find_collection(m):
         try:
             if hasattr(m, 'collection'):
@@ -36,7 +54,97 @@ def init_queryset(queryset_cls, model, schema_cls):
     return queryset_cls(model,
                         getattr(collection, 'name', collection),
                         container,
-                        getattr(schema_cls, 'postprocess_db_response', None))
+                        getattr(schema_cls, 'postprocess_db_response', None),
+                        document_cache)
+
+
+_READ_PREFERENCES = {
+    'primary': Primary,
+    'primaryPreferred': PrimaryPreferred,
+    'secondary': Secondary,
+    'secondaryPreferred': SecondaryPreferred,
+    'nearest': Nearest,
+}
+
+
+def get_read_preference(read_preference, max_staleness_seconds=None):
+    """Builds a pymongo read preference from a mode name such as
+    ``'secondaryPreferred'``, read preference instances pass through.
+    """
+    if read_preference is None or hasattr(read_preference, 'document'):
+        return read_preference
+    read_preference_cls = _READ_PREFERENCES.get(read_preference)
+    if read_preference_cls is None:
+        raise ValueError(
+            f'Unknown read preference "{read_preference}", expected one of '
+            f'{", ".join(_READ_PREFERENCES)}')
+    if read_preference_cls is Primary:
+        if max_staleness_seconds is not None:
+            raise ValueError(
+                'max_staleness_seconds does not apply to reads from the '
+                'primary')
+        return Primary()
+    return read_preference_cls(
+        max_staleness=-1 if max_staleness_seconds is None
+        else max_staleness_seconds)
+
+
+def max_time_options(max_time_ms):
+    # Commands take maxTimeMS, cursors from find take max_time_ms
+    return {'maxTimeMS': max_time_ms} if max_time_ms else {}
+
+
+def keyset_match(sort, values, after=True):
+    """Builds a range filter selecting documents past a keyset position.
+
+    For ``sort=[(a, 1), (b, -1)]`` and ``after=True`` this yields
+    ``a > va OR (a == va AND b < vb)``, which MongoDB serves from an index on
+    the sort keys.
+
+    Null and missing values sort before any other value, comparisons with
+    them are bracketed explicitly since ``{'$gt': None}`` matches nothing.
+    """
+    _or = []
+    for i, (k, d) in enumerate(sort):
+        greater = (d == pymongo.ASCENDING) == after
+        _predicate = {_k: v for (_k, _), v in zip(sort[:i], values)}
+        if values[i] is None:
+            if not greater:
+                # Nothing sorts before null
+                continue
+            _predicate[k] = {'$ne': None}
+        elif greater:
+            _predicate[k] = {'$gt': values[i]}
+        elif k == '_id':
+            _predicate[k] = {'$lt': values[i]}
+        else:
+            _predicate['$or'] = [{k: {'$lt': values[i]}}, {k: None}]
+        _or.append(_predicate)
+    return {'$or': _or} if _or else {'_id': {'$exists': False}}
+
+
+def seek_match(match, sort, after=None, before=None):
+    _and = [match] if match else []
+    if after is not None:
+        _and.append(keyset_match(sort, after, after=True))
+    if before is not None:
+        _and.append(keyset_match(sort, before, after=False))
+    if len(_and) > 1:
+        return {'$and': _and}
+    return _and[0] if _and else {}
+
+
+def collapse_projection(projection):
+    """Drops paths already covered by a projected ancestor.
+
+    MongoDB rejects projections such as ``{'a': 1, 'a.b': 1}``.
+    """
+    _paths = sorted(k for k, v in projection.items() if v)
+    _result = {}
+    for path in _paths:
+        if not any(path.startswith(f'{p}.') for p in _result):
+            _result[path] = True
+    return _result
 
 
 class BaseQueryset:
@@ -44,15 +152,21 @@ class BaseQueryset:
     collection_name = None
     embedded_documents_field = None
     documents_converter = None
+    document_cache = None
+    planner = None
+    read_preference = None
+    supports_facet = False
 
     def __init__(self, model,
                  collection_name=None,
                  embedded_docs_field=None,
-                 doc_converter=None):
+                 doc_converter=None,
+                 document_cache=None):
         super().__init__()
         self.model = model
         self.embedded_documents_field = embedded_docs_field
         self.documents_converter = doc_converter
+        self.document_cache = document_cache
 
         if collection_name:
             self.collection_name = collection_name
@@ -81,16 +195,134 @@ class BaseQueryset:
 
     @cached_property
     def collection(self):
-        return self.model.opts.instance.db[self.collection_name]
+        collection = self.model.opts.instance.db[self.collection_name]
+        if self.read_preference is not None:
+            collection = collection.with_options(
+                read_preference=self.read_preference)
+        return collection
+
+    def with_read_preference(self, read_preference):
+        """Returns a copy of the queryset reading from a collection handle
+        bound to ``read_preference``, copies are kept per preference.
+        """
+        if read_preference is None:
+            return self
+        querysets = self.__dict__.setdefault('_read_preference_querysets', {})
+        key = repr(read_preference)
+        queryset = querysets.get(key)
+        if queryset is None:
+            queryset = querysets[key] = copy.copy(self)
+            queryset.read_preference = read_preference
+            queryset.collection = self.collection.with_options(
+                read_preference=read_preference)
+        return queryset
 
-    async def find(self, match, projection, limit, skip):
+    async def get_server_version(self):
+        """The ``(major, minor)`` version of the server, only asked once."""
+        version = self.__dict__.get('_server_version')
+        if version is None:
+            info = await self.collection.database.client.server_info()
+            version = self._server_version = tuple(info['versionArray'][:2])
+        return version
+
+    async def supports_grouped_pages(self):
+        # $topN and $firstN came with MongoDB 5.2
+        return await self.get_server_version() >= (5, 2)
+
+    async def find(self, match, projection, limit, skip, sort, seek,
+                   max_time_ms):
         raise NotImplementedError
 
-    async def find_one(self, match, projection):
+    async def find_one(self, match, projection, max_time_ms):
         raise NotImplementedError
 
+    def stream(self, match, projection, sort, batch_size):
+        raise NotImplementedError
+
+    async def find_grouped(self, key, values, match, projection, limit,
+                           skip, sort, count_limit, max_time_ms):
+        raise NotImplementedError
+
+    async def count(self, match, limit, cache_ttl, max_time_ms):
+        raise NotImplementedError
+
+    def check_query(self, match, sort=None):
+        if self.planner is not None:
+            self.planner.check(self.collection_name, match, sort)
+
+    def report_query(self, instrumentation, operation, match, projection,
+                     documents, started, fetch_time, decode_time, sort=None,
+                     limit=0, skip=0):
+        documents = [d for d in documents if d]
+        instrumentation.on_query(QueryEvent(
+            field=get_current_field(),
+            collection=self.collection_name,
+            operation=operation,
+            filter_keys=sorted(set(iter_match_fields(match or {}))),
+            projection_size=len(projection or ()),
+            sort=sort,
+            limit=limit,
+            skip=skip,
+            documents=len(documents),
+            bytes=sum(len(BSON.encode(d)) for d in documents),
+            started=started,
+            fetch_time=fetch_time,
+            decode_time=decode_time))
+
+    async def collect(self, operation, cursor, match, projection, sort=None,
+                      limit=0, skip=0):
+        """Drains ``cursor`` into converted documents, reporting the query
+        when the request is instrumented.
+        """
+        instrumentation = get_instrumentation()
+        started, timer = time.time(), time.perf_counter()
+        try:
+            _raw = [document async for document in cursor]
+        except asyncio.CancelledError:
+            # Kills the server cursor of an abandoned read
+            await cursor.close()
+            raise
+        if instrumentation is None:
+            if self.documents_converter:
+                return [self.documents_converter(d) for d in _raw]
+            return _raw
+
+        fetched = time.perf_counter()
+        _documents = _raw
+        if self.documents_converter:
+            _documents = [self.documents_converter(d) for d in _raw]
+        self.report_query(instrumentation, operation, match, projection,
+                          _raw, started, fetched - timer,
+                          time.perf_counter() - fetched,
+                          sort=sort, limit=limit, skip=skip)
+        return _documents
+
+    def get_cache_id(self, match):
+        if self.document_cache is None or len(match) != 1:
+            return None
+        _id = match.get('_id')
+        if _id is None or isinstance(_id, dict):
+            return None
+        return _id
+
+    def invalidate(self, _id=None):
+        if self.document_cache is not None:
+            self.document_cache.invalidate(_id)
+
+    async def watch(self, **kwargs):
+        assert self.document_cache is not None, \
+            f'No document cache configured for {self.collection_name}'
+        await self.document_cache.watch(self.collection, **kwargs)
+
 
 class FindQueryset(BaseQueryset):
+    # Most counts kept for ``count(cache_ttl=...)``
+    count_cache_size = 1024
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._count_cache = OrderedDict()
+
     def get_field_names(self):
         return (f for f, _, _ in iter_fields(self.model, deep=True))
 
@@ -100,36 +332,462 @@ class FindQueryset(BaseQueryset):
         _python_fields = _get_umongo_mongo_world_fields(self.model)
         for k, v in _python_fields.items():
             _projections[k] = True
+        for k in _get_umongo_discriminator_paths(self.model):
+            _projections[f'{k}.{DISCRIMINATOR_FIELD}'] = True
         return _projections
 
-    async def find(self, match={}, projections={}, limit=0, skip=0):
-        _projections = self.base_projection
+    def get_projection(self, projections, sort=None):
+        if not projections:
+            return self.base_projection
+        _projections = {'_id': True}
         _projections.update(projections)
+        _projections.update({k: True for k, _ in sort or ()})
+        return collapse_projection(_projections)
+
+    async def find(self, match={}, projections={}, limit=0, skip=0,
+                   sort=None, seek=None, max_time_ms=None):
+        _projections = self.get_projection(projections, sort)
+
+        if seek:
+            match = seek_match(match, sort, **seek)
+        self.check_query(match, sort)
 
         cursor = self.collection.find(
             filter=match,
             projection=_projections,
             limit=limit,
-            skip=skip)
+            skip=skip,
+            sort=sort,
+            max_time_ms=max_time_ms)
 
-        if self.documents_converter:
-            _documents = [self.documents_converter(document)
-                          async for document in cursor]
+        return await self.collect('find', cursor, match, _projections,
+                                  sort=sort, limit=limit, skip=skip)
+
+    async def find_grouped(self, key, values, match={}, projections={},
+                           limit=0, skip=0, sort=None, count_limit=None,
+                           max_time_ms=None):
+        """Reads the page of documents of every ``key`` value with one
+        aggregation, returns ``{value: (documents, count)}`` where ``count``
+        is the number of matching documents before paging, capped at
+        ``count_limit``.
+
+        Groups only keep their first ``skip + limit`` documents with
+        ``$topN``, or ``$firstN`` when unsorted, which need MongoDB 5.2,
+        see :meth:`supports_grouped_pages`.
+        """
+        assert limit, 'Grouped reads need a page size'
+        _match = {key: {'$in': list(values)}}
+        if match:
+            _match = {'$and': [match, _match]}
+        self.check_query(_match, sort)
+
+        _projections = collapse_projection(
+            {**self.get_projection(projections, sort), key: True})
+
+        if sort:
+            _documents = {'$topN': {'n': skip + limit,
+                                    'sortBy': dict(sort),
+                                    'output': '$$ROOT'}}
         else:
-            _documents = [document
-                          async for document in cursor]
+            _documents = {'$firstN': {'n': skip + limit,
+                                      'input': '$$ROOT'}}
+        _pipeline = [
+            {'$match': _match},
+            {'$project': _projections},
+            {'$group': {
+                '_id': f'${key}',
+                'documents': _documents,
+                'count': {'$sum': 1},
+            }},
+        ]
 
-        return _documents
+        instrumentation = get_instrumentation()
+        started, timer = time.time(), time.perf_counter()
+        cursor = self.collection.aggregate(
+            _pipeline, **max_time_options(max_time_ms))
+        try:
+            _groups = [group async for group in cursor]
+        except asyncio.CancelledError:
+            await cursor.close()
+            raise
+        fetched = time.perf_counter()
 
-    async def find_one(self, match={}, projections={}):
-        _projections = self.base_projection
-        _projections.update(projections)
+        _result = {}
+        _raw = []
+        for group in _groups:
+            _documents = group['documents'][skip:]
+            _raw.extend(_documents)
+            if self.documents_converter:
+                _documents = [self.documents_converter(d)
+                              for d in _documents]
+            count = group['count']
+            if count_limit:
+                count = min(count, count_limit)
+            _result[group['_id']] = (_documents, count)
+
+        if instrumentation is not None:
+            self.report_query(instrumentation, 'aggregate', _match,
+                              _projections, _raw, started, fetched - timer,
+                              time.perf_counter() - fetched,
+                              sort=sort, limit=limit, skip=skip)
+        return _result
 
-        _result = await self.collection.find_one(
+    async def stream(self, match={}, projections={}, limit=0, skip=0,
+                     sort=None, batch_size=100):
+        """Yields converted documents while the cursor fetches them
+        ``batch_size`` at a time, so memory stays bounded by one batch.
+        """
+        self.check_query(match, sort)
+        _projections = self.get_projection(projections, sort)
+        cursor = self.collection.find(
             filter=match,
-            projection=_projections)
+            projection=_projections,
+            limit=limit,
+            skip=skip,
+            sort=sort,
+            batch_size=batch_size)
 
+        _documents = self.iterate('stream', cursor, match, _projections,
+                                  sort=sort, limit=limit, skip=skip)
+        try:
+            async for document in _documents:
+                yield document
+        finally:
+            await _documents.aclose()
+
+    async def iterate(self, operation, cursor, match, projection, sort=None,
+                      limit=0, skip=0):
+        """Yields converted documents from ``cursor`` and closes it, the
+        query is reported once the iteration ends when instrumented.
+        """
+        instrumentation = get_instrumentation()
+        started, timer = time.time(), time.perf_counter()
+        decode_time = 0
+        _raw = []
+        try:
+            async for document in cursor:
+                if instrumentation is not None:
+                    _raw.append(document)
+                    decoded = time.perf_counter()
+                if self.documents_converter:
+                    document = self.documents_converter(document)
+                if instrumentation is not None:
+                    decode_time += time.perf_counter() - decoded
+                yield document
+        finally:
+            await cursor.close()
+            if instrumentation is not None:
+                self.report_query(
+                    instrumentation, operation, match, projection, _raw,
+                    started, time.perf_counter() - timer - decode_time,
+                    decode_time, sort=sort, limit=limit, skip=skip)
+
+    async def find_one(self, match={}, projections={}, max_time_ms=None):
+        _projections = self.get_projection(projections)
+
+        _id = self.get_cache_id(match)
+        if _id is not None:
+            _result = self.document_cache.get(_id, _projections)
+            if _result is not None:
+                return _result
+            generation = self.document_cache.generation()
+        self.check_query(match)
+
+        instrumentation = get_instrumentation()
+        started, timer = time.time(), time.perf_counter()
+        _document = await self.collection.find_one(
+            filter=match,
+            projection=_projections,
+            max_time_ms=max_time_ms)
+        fetched = time.perf_counter()
+
+        _result = _document
         if self.documents_converter:
-            _result = self.documents_converter(_result)
+            _result = self.documents_converter(_document)
 
+        if instrumentation is not None:
+            self.report_query(instrumentation, 'find_one', match,
+                              _projections, [_document], started,
+                              fetched - timer, time.perf_counter() - fetched)
+
+        if _id is not None:
+            self.document_cache.set(_id, _projections, _result, generation)
         return _result
+
+    async def count(self, match={}, limit=None, cache_ttl=None,
+                    max_time_ms=None):
+        if cache_ttl:
+            key = json_util.dumps([match, limit], sort_keys=True)
+            cached = self._count_cache.get(key)
+            if cached and cached[1] > time.monotonic():
+                self._count_cache.move_to_end(key)
+                return cached[0]
+
+        instrumentation = get_instrumentation()
+        started, timer = time.time(), time.perf_counter()
+        if match:
+            self.check_query(match)
+            kwargs = max_time_options(max_time_ms)
+            if limit:
+                kwargs['limit'] = limit
+            _count = await self.collection.count_documents(match, **kwargs)
+        else:
+            _count = await self.collection.estimated_document_count(
+                **max_time_options(max_time_ms))
+            if limit:
+                _count = min(_count, limit)
+
+        if instrumentation is not None:
+            self.report_query(instrumentation, 'count', match, None, [],
+                              started, time.perf_counter() - timer, 0,
+                              limit=limit or 0)
+
+        if cache_ttl:
+            self.cache_count(key, _count, cache_ttl)
+        return _count
+
+    def cache_count(self, key, count, ttl):
+        now = time.monotonic()
+        self._count_cache[key] = (count, now + ttl)
+        self._count_cache.move_to_end(key)
+        if len(self._count_cache) <= self.count_cache_size:
+            return
+        # Expired counts are evicted before the least recently used ones
+        for k in [k for k, (_, expires) in self._count_cache.items()
+                  if expires <= now]:
+            del self._count_cache[k]
+        while len(self._count_cache) > self.count_cache_size:
+            self._count_cache.popitem(last=False)
+
+
+class AggregateQueryset(FindQueryset):
+    """Reads documents through an aggregation pipeline.
+
+    Selected reference fields are joined with ``$lookup`` so a page and the
+    documents it references come back in one round trip, and a page plus
+    its total count can be fetched together with ``$facet``.
+    """
+
+    supports_facet = True
+
+    def get_lookup_stages(self, projections):
+        registry = get_global_registry()
+        _stages = []
+        for path, model_name in _get_umongo_reference_paths(
+                self.model).items():
+            if path not in (projections or {}):
+                continue
+            _type = registry.get_type_for_model_name(model_name)
+            queryset = registry.get_queryset(_type._meta.model) \
+                if _type else None
+            if queryset is None:
+                continue
+            _stages.append({'$lookup': {
+                'from': queryset.collection_name,
+                'localField': path,
+                'foreignField': '_id',
+                'as': path,
+            }})
+            _stages.append({'$unwind': {
+                'path': f'${path}',
+                'preserveNullAndEmptyArrays': True,
+            }})
+        return _stages
+
+    def get_page_stages(self, projections, limit=0, skip=0, sort=None):
+        _stages = []
+        if sort:
+            _stages.append({'$sort': dict(sort)})
+        if skip:
+            _stages.append({'$skip': skip})
+        if limit:
+            _stages.append({'$limit': limit})
+        _stages.append({'$project': self.get_projection(projections, sort)})
+        # Joined after the projection, only documents of the page are looked up
+        _stages.extend(self.get_lookup_stages(projections))
+        return _stages
+
+    def get_pipeline(self, match={}, projections={}, limit=0, skip=0,
+                     sort=None, seek=None):
+        if seek:
+            match = seek_match(match, sort, **seek)
+        self.check_query(match, sort)
+
+        _pipeline = [{'$match': match}] if match else []
+        _pipeline.extend(self.get_page_stages(projections, limit, skip, sort))
+        return _pipeline
+
+    def convert(self, documents):
+        if not self.documents_converter:
+            return documents
+        return [self.documents_converter(d) for d in documents]
+
+    async def find(self, match={}, projections={}, limit=0, skip=0,
+                   sort=None, seek=None, max_time_ms=None):
+        cursor = self.collection.aggregate(self.get_pipeline(
+            match, projections, limit, skip, sort, seek),
+            **max_time_options(max_time_ms))
+        return await self.collect('aggregate', cursor, match, projections,
+                                  sort=sort, limit=limit, skip=skip)
+
+    async def find_with_count(self, match={}, projections={}, limit=0,
+                              skip=0, sort=None, count_limit=None,
+                              max_time_ms=None):
+        """Fetches one page and the number of matching documents with a
+        single ``$facet``, the page must fit the 16MB document limit.
+        """
+        self.check_query(match, sort)
+        _count = [{'$limit': count_limit}] if count_limit else []
+        _count.append({'$count': 'count'})
+
+        _pipeline = [{'$match': match}] if match else []
+        _pipeline.append({'$facet': {
+            'page': self.get_page_stages(projections, limit, skip, sort),
+            'count': _count,
+        }})
+
+        instrumentation = get_instrumentation()
+        started, timer = time.time(), time.perf_counter()
+        cursor = self.collection.aggregate(
+            _pipeline, **max_time_options(max_time_ms))
+        try:
+            _result = [document async for document in cursor]
+        except asyncio.CancelledError:
+            await cursor.close()
+            raise
+        fetched = time.perf_counter()
+
+        _facet = _result[0] if _result else {}
+        _count = _facet.get('count') or [{}]
+        _page = _facet.get('page', [])
+        _documents = self.convert(_page)
+        if instrumentation is not None:
+            self.report_query(instrumentation, 'aggregate', match,
+                              projections, _page, started, fetched - timer,
+                              time.perf_counter() - fetched,
+                              sort=sort, limit=limit, skip=skip)
+        return _documents, _count[0].get('count', 0)
+
+    async def stream(self, match={}, projections={}, limit=0, skip=0,
+                     sort=None, batch_size=100):
+        cursor = self.collection.aggregate(
+            self.get_pipeline(match, projections, limit, skip, sort),
+            batchSize=batch_size)
+
+        _documents = self.iterate('stream', cursor, match, projections,
+                                  sort=sort, limit=limit, skip=skip)
+        try:
+            async for document in _documents:
+                yield document
+        finally:
+            await _documents.aclose()
+
+    async def find_one(self, match={}, projections={}, max_time_ms=None):
+        if not self.get_lookup_stages(projections):
+            return await super().find_one(match, projections, max_time_ms)
+        _documents = await self.find(match, projections, limit=1,
+                                     max_time_ms=max_time_ms)
+        return _documents[0] if _documents else None
+
+
+class RequestQueryset:
+    """Request scoped view of a queryset which memoizes reads.
+
+    Identical queries issued while serving one request share a single
+    in-flight task instead of hitting MongoDB again. Reads of a request with
+    a deadline run with the remaining time as ``maxTimeMS`` and are
+    cancelled, killing their cursor, once it passes.
+    """
+
+    def __init__(self, queryset, context):
+        self.queryset = queryset
+        self.context = context
+        self.queries = get_context_state(context).setdefault('queries', {})
+
+    def __getattr__(self, name):
+        return getattr(self.queryset, name)
+
+    async def _memoize(self, method, fn, *args, **kwargs):
+        read_preference = getattr(self.queryset.read_preference, 'document',
+                                  None)
+        key = (self.queryset.collection_name, method,
+               json_util.dumps([args, kwargs, read_preference],
+                               sort_keys=True))
+        remaining = get_remaining_time(self.context)
+        if remaining is not None and remaining <= 0:
+            raise DeadlineExceeded(
+                f'Deadline exceeded before reading {key[0]}')
+
+        task = self.queries.get(key)
+        if task is None:
+            if remaining is not None:
+                kwargs['max_time_ms'] = max(int(remaining * 1000), 1)
+            task = self.queries[key] = asyncio.ensure_future(
+                fn(*args, **kwargs))
+
+            def _forget_failed(t):
+                if (t.cancelled() or t.exception()) and \
+                        self.queries.get(key) is t:
+                    del self.queries[key]
+            task.add_done_callback(_forget_failed)
+        # Shielded, one cancelled consumer must not cancel the others
+        try:
+            if remaining is None:
+                return await asyncio.shield(task)
+            return await asyncio.wait_for(asyncio.shield(task), remaining)
+        except asyncio.TimeoutError:
+            # Every consumer shares the deadline of the request
+            task.cancel()
+            raise DeadlineExceeded(f'Deadline exceeded reading {key[0]}')
+        except ExecutionTimeout:
+            raise DeadlineExceeded(f'Deadline exceeded reading {key[0]}')
+
+    async def find(self, *args, **kwargs):
+        return await self._memoize(
+            'find', self.queryset.find, *args, **kwargs)
+
+    async def find_one(self, *args, **kwargs):
+        return await self._memoize(
+            'find_one', self.queryset.find_one, *args, **kwargs)
+
+    async def count(self, *args, **kwargs):
+        return await self._memoize(
+            'count', self.queryset.count, *args, **kwargs)
+
+    async def find_with_count(self, *args, **kwargs):
+        return await self._memoize(
+            'find_with_count', self.queryset.find_with_count, *args, **kwargs)
+
+    async def find_grouped(self, *args, **kwargs):
+        return await self._memoize(
+            'find_grouped', self.queryset.find_grouped, *args, **kwargs)
+
+
+def get_request_queryset(model, context, registry=None,
+                         read_preference=None):
+    if not registry:
+        registry = get_global_registry()
+    queryset = registry.get_queryset(model)
+    if queryset is not None:
+        queryset = queryset.with_read_preference(read_preference)
+    if queryset is None or context is None:
+        return queryset
+    return RequestQueryset(queryset, context)
+
+
+def invalidate_request_cache(context, collection_name=None):
+    """Drops memoized reads after a write within the same request."""
+    if context is None:
+        return
+    state = get_context_state(context)
+    queries = state.get('queries', {})
+    for key in list(queries):
+        if collection_name is None or key[0] == collection_name:
+            del queries[key]
+    for name, loader in state.get('loaders', {}).items():
+        if collection_name is None or name == collection_name:
+            loader.clear()
+    children_loaders = state.get('children_loaders', {})
+    for key in list(children_loaders):
+        if collection_name is None or key[0] == collection_name:
+            del children_loaders[key]
@@ -1,10 +1,13 @@
 class Registry(object):
     def __init__(self):
         self._registry_models = {}
+        self._registry_model_names = {}
         self._registry_embeds = {}
         self._registry_querysets = {}
         self._registry_attributes = {}
         self._registry_unions = {}
+        self._registry_sort_enums = {}
+        self._registry_filters = {}
 
     def register(self, cls):
         from .types import ObjectType
@@ -13,10 +16,17 @@ class Registry(object):
             f'{ObjectType} can be registered, received "{cls.__name__}"'
         assert cls._meta.registry == self, 'Registry for a Model have to match.'
         self._registry_models[cls._meta.model] = cls
+        self._registry_model_names[cls._meta.model.__name__] = cls
 
     def get_type_for_model(self, model):
         return self._registry_models.get(model)
 
+    def get_type_for_model_name(self, model_name):
+        return self._registry_model_names.get(model_name)
+
+    def get_types(self):
+        return list(self._registry_models.values())
+
     def register_embedded_model(self, type_name, cls):
         self._registry_embeds[type_name] = cls
 
@@ -29,6 +39,9 @@ class Registry(object):
     def get_queryset(self, model):
         return self._registry_querysets.get(model)
 
+    def get_querysets(self):
+        return list(self._registry_querysets.values())
+
     def register_attributes(self, attributes_cls):
         self._registry_attributes[attributes_cls.__name__] = attributes_cls
 
@@ -41,6 +54,18 @@ class Registry(object):
     def get_union(self, class_name):
         return self._registry_unions.get(class_name)
 
+    def register_sort_enum(self, name, enum):
+        self._registry_sort_enums[name] = enum
+
+    def get_sort_enum(self, name):
+        return self._registry_sort_enums.get(name)
+
+    def register_filter(self, name, filter_type):
+        self._registry_filters[name] = filter_type
+
+    def get_filter(self, name):
+        return self._registry_filters.get(name)
+
 
 registry = None
 
@@ -6,7 +6,10 @@ __all__ = [
     'objecttype',
     'inputobjecttype',
     'mutation',
+    'BulkDocumentMutation',
+    'DocumentMutation',
     'InputObjectType',
     'Mutation',
+    'UpdateDocumentMutation',
     'ObjectType',
 ]
@@ -1,7 +1,58 @@
+import base64
 import importlib
+import re
+import uuid
+from collections import namedtuple
 from functools import lru_cache
 
+import graphene
+import pymongo
+from graphene.utils.str_converters import to_snake_case
+from graphql.language import ast
+from graphql.type import GraphQLObjectType
+from bson import ObjectId
 from umongo.abstract import BaseField
+from umongo.fields import (EmbeddedField, IntegerField, ObjectIdField,
+                           ReferenceField, UUIDField)
+from umongo.exceptions import NotRegisteredDocumentError
+
+DISCRIMINATOR_FIELD = '_cls'
+
+
+FieldInfo = namedtuple('FieldInfo', (
+    'name', 'field', 'attribute', 'mongo_name', 'converter',
+    'embedded_model', 'offspring', 'is_list'))
+
+
+@lru_cache(maxsize=None)
+def get_field_table(model):
+    """Field metadata of a model or template, its template is only walked
+    once however many schema build steps read it.
+    """
+    from .converter import convert_umongo_type
+
+    template = model.opts.template if hasattr(model, 'opts') else model
+
+    def _info(n, f):
+        embedded_doc = _get_embedded_field_model_class(f)
+        return FieldInfo(
+            name=n,
+            field=f,
+            attribute=f.attribute,
+            mongo_name=f.attribute or n,
+            converter=convert_umongo_type.dispatch(type(f)),
+            embedded_model=embedded_doc,
+            offspring=tuple(_iter_umongo_model_offspring(embedded_doc))
+            if embedded_doc else (),
+            is_list=hasattr(f, 'container'))
+
+    _table = []
+    for n in dir(template):
+        f = getattr(template, n)
+        for _f in f if isinstance(f, list) else (f,):
+            if _f and isinstance(_f, BaseField):
+                _table.append(_info(n, _f))
+    return tuple(_table)
 
 
 def iter_fields(model,
@@ -9,52 +60,185 @@ def iter_fields(model,
                 exclude_fields=(),
                 deep=False,
                 parent_field=None):
-    template = model.opts.template if hasattr(model, 'opts') else model
-    fields = dir(template)
+    for info in get_field_table(model):
+        full_field_name = f'{parent_field}.{info.name}' if parent_field \
+            else info.name
+
+        if deep and info.embedded_model:
+            yield from _iter_umongo_embedded_fields(
+                info.embedded_model, deep, full_field_name)
+            continue
+
+        yield full_field_name, info.name, info.field
+
+
+def iter_selection(selection_set, info, type_name=None):
+    def _applies(type_condition):
+        if not type_name or not type_condition:
+            return True
+        name = type_condition.name.value
+        return name == type_name or not isinstance(
+            info.schema.get_type(name), GraphQLObjectType)
+
+    for selection in selection_set.selections:
+        if isinstance(selection, ast.FragmentSpread):
+            fragment = info.fragments[selection.name.value]
+            if _applies(fragment.type_condition):
+                yield from iter_selection(
+                    fragment.selection_set, info, type_name)
+        elif isinstance(selection, ast.InlineFragment):
+            if _applies(selection.type_condition):
+                yield from iter_selection(
+                    selection.selection_set, info, type_name)
+        else:
+            yield selection
 
-    def __(n, f, deep, parent_field):
-        if not f or not isinstance(f, BaseField):
-            return
 
-        full_field_name = f'{parent_field}.{n}' if parent_field else n
+def is_field_selected(info, name):
+    for field in info.field_asts:
+        if not field.selection_set:
+            continue
+        for selection in iter_selection(field.selection_set, info):
+            if selection.name.value == name:
+                return True
+    return False
 
-        if deep:
-            embedded_doc = _get_embedded_field_model_class(f)
-            if embedded_doc:
-                yield from _iter_umongo_embedded_fields(
-                    embedded_doc, deep, full_field_name)
-                return
 
-        yield full_field_name, n, f
+CONNECTION_ARGUMENTS = frozenset(
+    ('first', 'last', 'before', 'after', 'sort', 'filter'))
+
+
+def _ast_value(value, variables):
+    if isinstance(value, ast.Variable):
+        return (variables or {}).get(value.name.value)
+    if isinstance(value, ast.IntValue):
+        return int(value.value)
+    if isinstance(value, ast.FloatValue):
+        return float(value.value)
+    if isinstance(value, ast.ListValue):
+        return [_ast_value(v, variables) for v in value.values]
+    if isinstance(value, ast.ObjectValue):
+        return {f.name.value: _ast_value(f.value, variables)
+                for f in value.fields}
+    return value.value
 
-    for n in fields:
-        f = getattr(template, n)
-        if not isinstance(f, list):
-            yield from __(n, f, deep, parent_field)
-        else:
-            for _f in f:
-                yield from __(n, _f, deep, parent_field)
 
+def get_query_match(model, info, args=None):
+    from .filters import compile_filter
 
-async def get_query(model, query_fn, info):
     python_fields = _get_umongo_python_world_fields(model)
 
-    def _build_match(info):
+    def _iter_args(info, args):
+        if args is not None:
+            yield from args.items()
+            return
         for field in info.field_asts:
             for arg in field.arguments:
-                k = python_fields.get(arg.name.value)
-                v = arg.value.value
-                if not v:
-                    continue
-                yield k, v
-
-    def _build_projection(match):
-        for k, v in match.items():
-            yield k, True
+                yield arg.name.value, _ast_value(
+                    arg.value, info.variable_values)
+
+    def _build_match(info, args):
+        for k, v in _iter_args(info, args):
+            if k in CONNECTION_ARGUMENTS or v is None:
+                continue
+            k = python_fields.get(k)
+            if not k:
+                continue
+            if k == '_id':
+                v = get_pk_value(model, v)
+            yield k, v
+
+    _match = {k: v for k, v in _build_match(info, args)}
+    if args and args.get('filter'):
+        _match.update(compile_filter(model, args['filter']))
+    return _match
+
+
+class _UnknownSelection(Exception):
+    pass
+
+
+def _iter_node_selections(info, connection=False):
+    for field in info.field_asts:
+        if not field.selection_set:
+            continue
+        if not connection:
+            yield field.selection_set
+            continue
+        for edges in iter_selection(field.selection_set, info):
+            if edges.name.value != 'edges' or not edges.selection_set:
+                continue
+            for node in iter_selection(edges.selection_set, info):
+                if node.name.value == 'node' and node.selection_set:
+                    yield node.selection_set
+
+
+def get_selection_paths(model, info, connection=False, type_name=None):
+    """Maps the selection set onto the Mongo paths of ``model``.
+
+    Returns ``None`` when a selected field is not backed by the model, in
+    which case the whole document has to be fetched.
+    """
+    from .registry import get_global_registry
 
-    _match = {k: v for k, v in _build_match(info)}
-    _projection = {k: v for k, v in _build_projection(_match)}
-    return await query_fn(_match, _projection)
+    python_fields = _get_umongo_python_world_fields(model)
+    discriminators = _get_umongo_discriminator_paths(model)
+    _type = get_global_registry().get_type_for_model(model)
+    type_fields = getattr(getattr(_type, '_meta', None), 'fields', None) or {}
+    containers = {
+        '.'.join(i.split('.')[:n])
+        for i in python_fields for n in range(1, i.count('.') + 1)
+    }
+
+    def _collect(selection_set, prefix, type_name=None):
+        for field in iter_selection(selection_set, info, type_name):
+            name = field.name.value
+            if name.startswith('__'):
+                continue
+            path = f'{prefix}{to_snake_case(name)}'
+            if path in python_fields:
+                yield python_fields[path]
+            elif path in containers and field.selection_set:
+                if path in discriminators:
+                    yield f'{path}.{DISCRIMINATOR_FIELD}'
+                _paths = list(_collect(field.selection_set, f'{path}.'))
+                # Only meta fields selected, the document must still exist
+                yield from _paths or [path]
+            elif path in containers:
+                yield path
+            elif getattr(type_fields.get(path), 'options', {}).get(
+                    'foreign_key') and not prefix:
+                # Children connections only need the parent key
+                local_key = type_fields[path].options['local_key']
+                yield python_fields.get(local_key, local_key)
+            else:
+                raise _UnknownSelection(path)
+
+    paths = set()
+    try:
+        for selection_set in _iter_node_selections(info, connection):
+            paths.update(_collect(selection_set, '', type_name))
+    except _UnknownSelection:
+        return None
+    return paths
+
+
+def get_query_projection(model, info, match, connection=False):
+    from .registry import get_global_registry
+
+    _type = get_global_registry().get_type_for_model(model)
+    paths = get_selection_paths(model, info, connection,
+                                _type._meta.name if _type else None)
+    if not paths:
+        return {}
+    return {k: True for k in paths}
+
+
+async def get_query(model, query_fn, info, connection=False, args=None,
+                    **kwargs):
+    _match = get_query_match(model, info, args)
+    _projection = get_query_projection(model, info, _match, connection)
+    return await query_fn(_match, _projection, **kwargs)
 
 
 def _iter_umongo_model_offspring(model_or_template):
@@ -64,7 +248,8 @@ def _iter_umongo_model_offspring(model_or_template):
         module = importlib.import_module(model_or_template.__module__)
         model = getattr(module, model_or_template.__name__, model_or_template)
 
-    for offspring in model.opts.offspring:
+    opts = getattr(model, 'opts', None)
+    for offspring in getattr(opts, 'offspring', ()):
         yield offspring
 
 
@@ -88,34 +273,176 @@ def _get_embedded_field_model_class(f):
     return embedded_doc
 
 
+def _to_mongo_path(path, attribute):
+    if not attribute:
+        return path
+    return '.'.join(path.split('.')[:-1] + [attribute])
+
+
 @lru_cache(maxsize=None)
 def _get_umongo_python_world_fields(model):
     _conv = {'id': '_id'}
-
-    def _to_python_world(i, a):
-        if a == '_id':
-            return f"{'.'.join(i.split('.')[:-1])}.id"
-        return i
-
     for i, n, f in iter_fields(model, deep=True):
-        _conv[i] = _to_python_world(i, f.attribute)
+        _conv[i] = _to_mongo_path(i, f.attribute)
     return _conv
 
 
 @lru_cache(maxsize=None)
-def _get_umongo_mongo_world_fields(model):
-    _conv = {'_id': 'id'}
+def _get_umongo_discriminator_paths(model, parent_field=None):
+    _paths = set()
+    for info in get_field_table(model):
+        embedded_doc = info.embedded_model
+        if not embedded_doc:
+            continue
+        path = f'{parent_field}.{info.name}' if parent_field else info.name
+        if getattr(embedded_doc.Meta, 'abstract', False):
+            _paths.add(path)
+        for m in (embedded_doc, *info.offspring):
+            _paths.update(_get_umongo_discriminator_paths(m, path))
+    return frozenset(_paths)
+
 
-    def _to_mongo_world(i, a):
-        if a == '_id':
-            return f"{'.'.join(i.split('.')[:-1])}._id"
-        return i
+@lru_cache(maxsize=None)
+def _get_umongo_reference_paths(model, parent_field=None):
+    """Maps the Mongo path of every single-valued ``ReferenceField`` of
+    ``model`` to the name of the referenced document.
+    """
+    _paths = {}
+    for info in get_field_table(model):
+        f = info.field
+        path = f'{parent_field}.{info.mongo_name}' if parent_field \
+            else info.mongo_name
+        if isinstance(f, ReferenceField) and f.attribute != '_id':
+            document = f.document
+            _paths[path] = document if isinstance(document, str) \
+                else document.__name__
+        elif isinstance(f, EmbeddedField):
+            for m in (info.embedded_model, *info.offspring):
+                _paths.update(_get_umongo_reference_paths(m, path))
+    return _paths
 
+
+@lru_cache(maxsize=None)
+def _get_umongo_mongo_world_fields(model):
+    _conv = {'_id': 'id'}
     for i, n, f in iter_fields(model, deep=True):
-        _conv[_to_mongo_world(i, f.attribute)] = i
+        _conv[_to_mongo_path(i, f.attribute)] = i
     return _conv
 
 
+def sort_enum_for_model(model, name=None, registry=None):
+    from .registry import get_global_registry
+
+    if not registry:
+        registry = get_global_registry()
+    if not name:
+        name = f'{model.__name__}SortEnum'
+
+    enum = registry.get_sort_enum(name)
+    if not enum:
+        queryset = registry.get_queryset(model)
+        planner = getattr(queryset, 'planner', None)
+        sortable = None
+        if planner is not None and planner.sort_indexed_only:
+            sortable = planner.sortable_fields
+
+        items = []
+        for i, mongo_path in _get_umongo_python_world_fields(model).items():
+            if sortable is not None and mongo_path not in sortable:
+                continue
+            key = i.replace('.', '_').upper()
+            items.append((f'{key}_ASC', (mongo_path, pymongo.ASCENDING)))
+            items.append((f'{key}_DESC', (mongo_path, pymongo.DESCENDING)))
+        enum = graphene.Enum(name, items)
+        enum.default = enum.ID_ASC
+        registry.register_sort_enum(name, enum)
+    return enum
+
+
+def sort_argument_for_model(model, has_default=True):
+    enum = sort_enum_for_model(model)
+    default = [enum.default.value] if has_default else None
+    return graphene.Argument(graphene.List(enum), default_value=default)
+
+
+def get_sort(sort):
+    if not sort:
+        return None
+    if not isinstance(sort, list):
+        sort = [sort]
+    return [tuple(getattr(s, 'value', s)) for s in sort]
+
+
+@lru_cache(maxsize=None)
+def _get_pk_field(model):
+    for info in get_field_table(model):
+        if info.mongo_name == '_id':
+            return info.field
+    return None
+
+
+def get_pk_value(model, value):
+    pk_field = _get_pk_field(model) if model else None
+    if not isinstance(value, str):
+        return value
+    if pk_field is None or isinstance(pk_field, ObjectIdField):
+        return ObjectId(value) if ObjectId.is_valid(value) else value
+    if isinstance(pk_field, UUIDField):
+        try:
+            return uuid.UUID(value)
+        except ValueError:
+            return value
+    if isinstance(pk_field, IntegerField) and value.lstrip('-').isdigit():
+        return int(value)
+    return value
+
+
+def get_reference_model(model, f):
+    """The document the ``ReferenceField`` ``f`` of ``model`` points to,
+    ``None`` until it is registered.
+    """
+    instance = f.instance or getattr(
+        getattr(model, 'opts', None), 'instance', None)
+    if instance is None:
+        return None
+    try:
+        return instance.retrieve_document(f.document)
+    except NotRegisteredDocumentError:
+        return None
+
+
+_BASE64 = re.compile(
+    r'^(?:[A-Za-z0-9+/]{4})*(?:[A-Za-z0-9+/]{2}==|[A-Za-z0-9+/]{3}=)?$')
+_TYPE_NAME = re.compile(r'^[_A-Za-z][_0-9A-Za-z]*$')
+
+
+def decode_global_id(value):
+    """Returns the ``(type, id)`` pair of a Relay global id, or
+    ``(None, value)`` when ``value`` is not one. Never raises, raw database
+    ids pass through untouched.
+    """
+    if not isinstance(value, str) or not _BASE64.match(value):
+        return None, value
+    decoded = base64.b64decode(value).decode('utf-8', 'replace')
+    _type, sep, _id = decoded.partition(':')
+    if not sep or not _id or '\ufffd' in decoded or \
+            not _TYPE_NAME.match(_type):
+        return None, value
+    return _type, _id
+
+
+def get_context_state(context):
+    if context is None:
+        return {}
+    if isinstance(context, dict):
+        return context.setdefault('graphene_umongo', {})
+    state = getattr(context, 'graphene_umongo', None)
+    if state is None:
+        state = {}
+        setattr(context, 'graphene_umongo', state)
+    return state
+
+
 def get_column_doc(column):
     return column.metadata.get("doc", None)
 
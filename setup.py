@@ -20,7 +20,7 @@ requirements = [
 tests_require = [
     "pytest",
     "mock",
-    "pytest",
+    "mongomock",
 ]
 
 setup(
@@ -0,0 +1,19 @@
+import pytest
+
+from graphene_umongo.registry import get_global_registry
+
+from .models import db
+from .schema import profile_cache
+
+
+@pytest.fixture(autouse=True)
+def stand_in():
+    db.reset()
+    profile_cache.invalidate()
+    for queryset in get_global_registry().get_querysets():
+        queryset._count_cache.clear()
+        for _queryset in (queryset, *queryset.__dict__.get(
+                '_read_preference_querysets', {}).values()):
+            # Tests set the version the stand-in reports
+            _queryset.__dict__.pop('_server_version', None)
+    yield db
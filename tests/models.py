@@ -0,0 +1,104 @@
+from umongo import Document, EmbeddedDocument, fields
+from umongo.frameworks import MotorAsyncIOInstance
+
+from .stand_in import StandInDatabase
+
+
+class StandInInstance(MotorAsyncIOInstance):
+    """Motor instance reading from the in-memory stand-in."""
+
+    def init(self, db):
+        self._db = db
+
+
+db = StandInDatabase()
+instance = StandInInstance()
+instance.init(db)
+
+
+@instance.register
+class Address(EmbeddedDocument):
+    street = fields.StrField()
+    number = fields.IntField()
+
+    class Meta:
+        abstract = False
+
+
+@instance.register
+class Pet(EmbeddedDocument):
+    name = fields.StrField()
+
+    class Meta:
+        allow_inheritance = True
+        abstract = True
+
+
+@instance.register
+class Dog(Pet):
+    barks = fields.BoolField()
+
+
+@instance.register
+class Cat(Pet):
+    lives = fields.IntField()
+
+
+@instance.register
+class Publisher(Document):
+    id = fields.StrField(attribute='_id')
+    name = fields.StrField()
+
+    class Meta:
+        collection_name = 'publisher'
+
+
+@instance.register
+class Author(Document):
+    name = fields.StrField()
+    age = fields.IntField()
+
+    class Meta:
+        collection_name = 'author'
+
+
+@instance.register
+class Book(Document):
+    title = fields.StrField(required=True)
+    pages = fields.IntField(default=10)
+    tags = fields.ListField(fields.StrField())
+    author = fields.ReferenceField(Author)
+    publisher = fields.ReferenceField(Publisher)
+    address = fields.EmbeddedField(Address)
+    pet = fields.EmbeddedField(Pet)
+    pets = fields.ListField(fields.EmbeddedField(Pet))
+
+    class Meta:
+        collection_name = 'book'
+
+
+@instance.register
+class Profile(Document):
+    nickname = fields.StrField()
+
+    class Meta:
+        collection_name = 'profile'
+
+
+@instance.register
+class Review(Document):
+    stars = fields.IntField()
+    book = fields.ReferenceField(Book)
+
+    class Meta:
+        collection_name = 'review'
+
+
+@instance.register
+class Chapter(Document):
+    name = fields.StrField()
+    number = fields.IntField()
+    book = fields.ReferenceField(Book)
+
+    class Meta:
+        collection_name = 'chapter'
@@ -0,0 +1,188 @@
+import graphene
+from graphql.execution.executors.asyncio import AsyncioExecutor
+
+from graphene_umongo import (UMongoAggregateQueryset,
+                             UMongoBulkDocumentMutation,
+                             UMongoConnectionField, UMongoDocumentCache,
+                             UMongoDocumentMutation, UMongoInputObjectType,
+                             UMongoNodesField, UMongoObjectType,
+                             UMongoStreamField,
+                             UMongoUpdateDocumentMutation)
+
+from .models import Author, Book, Chapter, Profile, Publisher, Review
+
+profile_cache = UMongoDocumentCache(maxsize=2, ttl=60)
+
+
+class PublisherType(UMongoObjectType):
+    class Meta:
+        model = Publisher
+        interfaces = (graphene.relay.Node,)
+
+
+class BookType(UMongoObjectType):
+    class Meta:
+        model = Book
+        interfaces = (graphene.relay.Node,)
+
+
+class AuthorType(UMongoObjectType):
+    class Meta:
+        model = Author
+        interfaces = (graphene.relay.Node,)
+
+    books = UMongoConnectionField(BookType._meta.connection,
+                                  foreign_key='author')
+    capped_books = UMongoConnectionField(BookType._meta.connection,
+                                         foreign_key='author',
+                                         total_count_limit=2)
+
+
+class ProfileType(UMongoObjectType):
+    class Meta:
+        model = Profile
+        interfaces = (graphene.relay.Node,)
+        document_cache = profile_cache
+
+
+class ReviewType(UMongoObjectType):
+    class Meta:
+        model = Review
+        interfaces = (graphene.relay.Node,)
+        read_preference = 'secondaryPreferred'
+        max_staleness_seconds = 90
+
+
+class ChapterType(UMongoObjectType):
+    class Meta:
+        model = Chapter
+        interfaces = (graphene.relay.Node,)
+        queryset = UMongoAggregateQueryset
+
+
+class Query(graphene.ObjectType):
+    node = graphene.relay.Node.Field()
+    nodes = UMongoNodesField()
+    authors = UMongoConnectionField(AuthorType._meta.connection)
+    books = UMongoConnectionField(BookType._meta.connection)
+    books_by_keyset = UMongoConnectionField(BookType._meta.connection,
+                                            keyset=True)
+    cached_books = UMongoConnectionField(BookType._meta.connection,
+                                         total_count_cache=60)
+    analytics_books = UMongoConnectionField(BookType._meta.connection,
+                                            read_preference='secondary')
+    profiles = UMongoConnectionField(ProfileType._meta.connection)
+    reviews = UMongoConnectionField(ReviewType._meta.connection)
+    chapters = UMongoConnectionField(ChapterType._meta.connection)
+
+
+class BookAddressInput(graphene.InputObjectType):
+    street = graphene.String()
+    number = graphene.Int()
+
+
+class BookInput(graphene.InputObjectType):
+    id = graphene.ID()
+    title = graphene.String()
+    pages = graphene.Int()
+    tags = graphene.List(graphene.String)
+    author = graphene.ID()
+    address = BookAddressInput()
+
+
+class UpsertBook(UMongoDocumentMutation):
+    class Arguments:
+        input = BookInput(required=True)
+
+    Output = BookType
+
+
+class UpsertBooks(UMongoBulkDocumentMutation):
+    class Arguments:
+        inputs = graphene.List(graphene.NonNull(BookInput), required=True)
+
+    Output = graphene.List(BookType)
+
+
+class BookAttributes(UMongoInputObjectType):
+    class Meta:
+        schema = BookType
+
+
+class UpsertBookAttributes(UMongoBulkDocumentMutation):
+    class Arguments:
+        inputs = graphene.List(graphene.NonNull(BookAttributes),
+                               required=True)
+
+    Output = graphene.List(BookType)
+
+
+class UpdateBook(UMongoUpdateDocumentMutation):
+    class Arguments:
+        input = BookInput(required=True)
+
+    Output = BookType
+
+    class Meta:
+        push_fields = ('tags',)
+
+
+class PublisherInput(graphene.InputObjectType):
+    id = graphene.ID()
+    name = graphene.String()
+
+
+class UpsertPublisher(UMongoDocumentMutation):
+    class Arguments:
+        input = PublisherInput(required=True)
+
+    Output = PublisherType
+
+
+class ReviewInput(graphene.InputObjectType):
+    id = graphene.ID()
+    stars = graphene.Int()
+
+
+class UpsertReview(UMongoDocumentMutation):
+    class Arguments:
+        input = ReviewInput(required=True)
+
+    Output = ReviewType
+
+
+class UpdateReview(UMongoUpdateDocumentMutation):
+    class Arguments:
+        input = ReviewInput(required=True)
+
+    Output = ReviewType
+
+
+class Mutation(graphene.ObjectType):
+    upsert_book = UpsertBook.Field()
+    upsert_books = UpsertBooks.Field()
+    upsert_book_attributes = UpsertBookAttributes.Field()
+    update_book = UpdateBook.Field()
+    upsert_publisher = UpsertPublisher.Field()
+    upsert_review = UpsertReview.Field()
+    update_review = UpdateReview.Field()
+
+
+class Subscription(graphene.ObjectType):
+    book_stream = UMongoStreamField(BookType, batch_size=2)
+
+
+schema = graphene.Schema(query=Query, mutation=Mutation,
+                         subscription=Subscription)
+
+
+def execute(query, variables=None, context=None, **kwargs):
+    kwargs.setdefault('executor', AsyncioExecutor())
+    return schema.execute(query,
+                          variable_values=variables,
+                          context_value={} if context is None else context,
+                          **kwargs)
+
+
+def to_global_id(type_name, _id):
+    return graphene.relay.Node.to_global_id(type_name, str(_id))
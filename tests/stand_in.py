@@ -0,0 +1,212 @@
+"""In-memory stand-in for a Motor database backed by mongomock.
+
+Every operation is recorded in ``db.calls`` together with the options the
+collection handle was bound to, reads can be slowed down with
+``db.latency`` and the reported server version set with ``db.version``.
+"""
+import asyncio
+from collections import namedtuple
+
+import mongomock
+
+Call = namedtuple('Call', ('operation', 'collection', 'args', 'kwargs',
+                           'options'))
+
+# Options the stand-in records but mongomock doesn't understand
+_IGNORED_OPTIONS = ('max_time_ms', 'maxTimeMS', 'batch_size', 'batchSize')
+
+
+def _strip(kwargs):
+    return {k: v for k, v in kwargs.items() if k not in _IGNORED_OPTIONS}
+
+
+def _get_path(document, path):
+    for part in path.split('.'):
+        if not isinstance(document, dict):
+            return None
+        document = document.get(part)
+    return document
+
+
+def _sort(documents, sort):
+    # Nulls and missing values sort first, like MongoDB
+    for key, direction in reversed(list(sort.items())):
+        documents = sorted(
+            documents,
+            key=lambda d: (_get_path(d, key) is not None,
+                           _get_path(d, key)),
+            reverse=direction < 0)
+    return documents
+
+
+def _group_top_n(documents, group):
+    groups = {}
+    for document in documents:
+        key = _get_path(document, group['_id'][1:])
+        groups.setdefault(repr(key), (key, []))[1].append(document)
+
+    result = []
+    for key, members in groups.values():
+        _group = {'_id': key}
+        for name, accumulator in group.items():
+            if name == '_id':
+                continue
+            if '$topN' in accumulator:
+                top = accumulator['$topN']
+                assert top['output'] == '$$ROOT', top
+                _group[name] = _sort(members, top['sortBy'])[:top['n']]
+            elif '$firstN' in accumulator:
+                first = accumulator['$firstN']
+                assert first['input'] == '$$ROOT', first
+                _group[name] = members[:first['n']]
+            elif accumulator == {'$sum': 1}:
+                _group[name] = len(members)
+            else:
+                raise NotImplementedError(accumulator)
+        result.append(_group)
+    return result
+
+
+class StandInCursor:
+    def __init__(self, documents, database):
+        self.documents = list(documents)
+        self.database = database
+        self.closed = False
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        await asyncio.sleep(self.database.latency)
+        if self.closed or not self.documents:
+            raise StopAsyncIteration
+        return self.documents.pop(0)
+
+    async def close(self):
+        self.closed = True
+
+
+class StandInClient:
+    def __init__(self, database):
+        self.database = database
+
+    async def server_info(self):
+        return {'version': '.'.join(str(v) for v in self.database.version),
+                'versionArray': list(self.database.version) + [0]}
+
+
+class StandInCollection:
+    def __init__(self, database, collection, options=None):
+        self.database = database
+        self.collection = collection
+        self.name = collection.name
+        self.options = options or {}
+
+    def _record(self, operation, *args, **kwargs):
+        self.database.calls.append(Call(
+            operation, self.name, args, kwargs, dict(self.options)))
+
+    def with_options(self, **options):
+        return StandInCollection(self.database, self.collection,
+                                 dict(self.options, **options))
+
+    def find(self, filter=None, projection=None, sort=None, **kwargs):
+        self._record('find', filter, projection, sort=sort, **kwargs)
+        cursor = self.collection.find(filter or {}, projection,
+                                      **_strip(kwargs))
+        if sort:
+            cursor = cursor.sort(sort)
+        cursor = StandInCursor(cursor, self.database)
+        self.database.cursors.append(cursor)
+        return cursor
+
+    async def find_one(self, filter=None, projection=None, **kwargs):
+        self._record('find_one', filter, projection, **kwargs)
+        # Read on the server first, the reply takes the latency to arrive
+        document = self.collection.find_one(filter or {}, projection)
+        await asyncio.sleep(self.database.latency)
+        return document
+
+    async def count_documents(self, filter, **kwargs):
+        self._record('count_documents', filter, **kwargs)
+        await asyncio.sleep(self.database.latency)
+        return self.collection.count_documents(filter, **_strip(kwargs))
+
+    async def estimated_document_count(self, **kwargs):
+        self._record('estimated_document_count', **kwargs)
+        await asyncio.sleep(self.database.latency)
+        return self.collection.estimated_document_count()
+
+    def aggregate(self, pipeline, **kwargs):
+        self._record('aggregate', pipeline, **kwargs)
+        cursor = StandInCursor(self._aggregate(pipeline), self.database)
+        self.database.cursors.append(cursor)
+        return cursor
+
+    def _aggregate(self, pipeline):
+        # mongomock has no $topN nor $firstN, group those stages in Python
+        for i, stage in enumerate(pipeline):
+            group = stage.get('$group', {})
+            if not any(isinstance(v, dict) and
+                       ('$topN' in v or '$firstN' in v)
+                       for v in group.values()):
+                continue
+            assert self.database.version >= (5, 2), \
+                '$topN and $firstN require MongoDB 5.2'
+            documents = _group_top_n(
+                list(self.collection.aggregate(pipeline[:i])), group)
+            if not documents or not pipeline[i + 1:]:
+                return documents
+            groups = mongomock.MongoClient().db.groups
+            groups.insert_many(documents)
+            return list(groups.aggregate(pipeline[i + 1:]))
+        return list(self.collection.aggregate(pipeline))
+
+    async def find_one_and_update(self, filter, update, **kwargs):
+        self._record('find_one_and_update', filter, update, **kwargs)
+        return self.collection.find_one_and_update(filter, update,
+                                                   **_strip(kwargs))
+
+    async def update_one(self, filter, update, **kwargs):
+        self._record('update_one', filter, update, **kwargs)
+        return self.collection.update_one(filter, update, **kwargs)
+
+    async def bulk_write(self, requests, **kwargs):
+        self._record('bulk_write', requests, **kwargs)
+        return self.collection.bulk_write(requests, **kwargs)
+
+    async def insert_many(self, documents, **kwargs):
+        self._record('insert_many', documents, **kwargs)
+        return self.collection.insert_many(documents, **kwargs)
+
+    async def index_information(self):
+        return self.collection.index_information()
+
+
+class StandInDatabase:
+    def __init__(self):
+        self.database = mongomock.MongoClient().db
+        self.client = StandInClient(self)
+        self.collections = {}
+        self.reset()
+
+    def reset(self):
+        # Querysets keep their collection handles, only the data goes
+        for name in self.database.list_collection_names():
+            self.database[name].delete_many({})
+        self.calls = []
+        self.cursors = []
+        self.latency = 0
+        self.version = (6, 0)
+
+    def __getitem__(self, name):
+        collection = self.collections.get(name)
+        if collection is None:
+            collection = self.collections[name] = StandInCollection(
+                self, self.database[name])
+        return collection
+
+    def get_calls(self, operation=None, collection=None):
+        return [c for c in self.calls
+                if operation in (None, c.operation) and
+                collection in (None, c.collection)]
@@ -0,0 +1,54 @@
+from bson import ObjectId
+
+from .models import db
+from .schema import execute
+
+
+def insert_chapters():
+    books = [ObjectId(), ObjectId()]
+    db['book'].collection.insert_many([
+        {'_id': _id, 'title': f'b{i}'} for i, _id in enumerate(books)])
+    db['chapter'].collection.insert_many([
+        {'name': f'c{i}', 'number': i, 'book': books[i % 2]}
+        for i in range(4)] + [{'name': 'c4', 'number': 4}])
+
+
+def get_chapters(result):
+    assert not result.errors, result.errors
+    return [e['node'] for e in result.data['chapters']['edges']]
+
+
+def test_selected_references_are_joined():
+    insert_chapters()
+    result = execute('{ chapters(first: 5) { edges { node { '
+                     'name book { title } } } } }')
+    assert get_chapters(result) == [
+        {'name': 'c0', 'book': {'title': 'b0'}},
+        {'name': 'c1', 'book': {'title': 'b1'}},
+        {'name': 'c2', 'book': {'title': 'b0'}},
+        {'name': 'c3', 'book': {'title': 'b1'}},
+        {'name': 'c4', 'book': None}]
+
+    aggregate, = db.calls
+    stages = [next(iter(s)) for s in aggregate.args[0]]
+    assert stages == ['$sort', '$limit', '$project', '$lookup', '$unwind']
+
+
+def test_unselected_references_are_not_joined():
+    insert_chapters()
+    get_chapters(execute('{ chapters(first: 2) { edges { node { '
+                         'name } } } }'))
+    aggregate, = db.calls
+    assert not any('$lookup' in s for s in aggregate.args[0])
+
+
+def test_page_and_count_are_read_together():
+    insert_chapters()
+    result = execute('{ chapters(first: 2, filter: {number: {gte: 1}}) { '
+                     'totalCount edges { node { name } } } }')
+    assert get_chapters(result) == [{'name': 'c1'}, {'name': 'c2'}]
+    assert result.data['chapters']['totalCount'] == 4
+
+    aggregate, = db.calls
+    assert aggregate.args[0][0] == {'$match': {'number': {'$gte': 1}}}
+    assert '$facet' in aggregate.args[0][1]
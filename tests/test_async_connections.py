@@ -0,0 +1,57 @@
+import asyncio
+import inspect
+import time
+
+import graphene
+from bson import ObjectId
+from graphql.execution.executors.asyncio import AsyncioExecutor
+
+from graphene_umongo import UMongoConnectionField
+
+from .models import Book, db
+from .schema import BookType, execute
+
+
+def test_connection_resolver_is_a_coroutine():
+    field = UMongoConnectionField(BookType._meta.connection)
+    resolver = field.get_resolver(lambda root, info, **args: None)
+    assert inspect.iscoroutinefunction(resolver.func)
+
+
+def test_sibling_connections_read_concurrently():
+    author = ObjectId()
+    db['author'].collection.insert_one({'_id': author, 'name': 'a'})
+    db['book'].collection.insert_many(
+        [{'title': f't{i}', 'author': author} for i in range(3)])
+    db.latency = 0.1
+
+    start = time.monotonic()
+    result = execute('{ authors(first: 1) { edges { node { name } } } '
+                     'books(first: 3) { edges { node { title } } } }')
+    elapsed = time.monotonic() - start
+    assert not result.errors, result.errors
+    assert len(result.data['books']['edges']) == 3
+
+    # Read one after the other the authors and books cursors take 2 and 4
+    # round trips
+    assert elapsed < 5.5 * db.latency
+    assert {c.collection for c in db.get_calls('find')} == {'author', 'book'}
+
+
+def test_awaitable_resolver_results():
+    class Query(graphene.ObjectType):
+        books = UMongoConnectionField(BookType._meta.connection)
+
+        async def resolve_books(root, info, **args):
+            await asyncio.sleep(0)
+            return [Book(title='t0'), Book(title='t1')]
+
+    schema = graphene.Schema(query=Query, types=[BookType])
+    result = schema.execute('{ books(first: 1) { edges { node { title } } '
+                            'pageInfo { hasNextPage } } }',
+                            executor=AsyncioExecutor())
+    assert not result.errors, result.errors
+    assert result.data['books'] == {
+        'edges': [{'node': {'title': 't0'}}],
+        'pageInfo': {'hasNextPage': True}}
+    assert not db.calls
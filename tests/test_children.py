@@ -0,0 +1,77 @@
+import pytest
+from bson import ObjectId
+
+from .models import db
+from .schema import execute
+
+QUERY = '''{ authors(first: 10) { edges { node { name
+    books(first: 2, sort: [PAGES_ASC]) { totalCount edges { node { title } } }
+} } } }'''
+
+
+def insert_authors():
+    authors = [ObjectId() for _ in range(3)]
+    db['author'].collection.insert_many([
+        {'_id': _id, 'name': f'a{i}', 'age': 40}
+        for i, _id in enumerate(authors)])
+    db['book'].collection.insert_many([
+        {'title': f'a{i}b{j}', 'pages': 10 - j, 'author': _id}
+        for i, _id in enumerate(authors) for j in range(i + 1)])
+    return authors
+
+
+def get_books(result):
+    assert not result.errors, result.errors
+    return {e['node']['name']: (
+        e['node']['books']['totalCount'],
+        [b['node']['title'] for b in e['node']['books']['edges']])
+        for e in result.data['authors']['edges']}
+
+
+EXPECTED = {'a0': (1, ['a0b0']), 'a1': (2, ['a1b1', 'a1b0']),
+            'a2': (3, ['a2b2', 'a2b1'])}
+
+
+def test_children_are_read_with_one_aggregation():
+    insert_authors()
+    assert get_books(execute(QUERY)) == EXPECTED
+
+    aggregate, = db.get_calls('aggregate', 'book')
+    group = aggregate.args[0][2]['$group']
+    assert group['documents'] == {'$topN': {
+        'n': 3, 'sortBy': {'pages': 1}, 'output': '$$ROOT'}}
+    assert not db.get_calls('find', 'book')
+
+
+def test_children_fall_back_to_per_parent_reads():
+    insert_authors()
+    db.version = (5, 0)
+    assert get_books(execute(QUERY)) == EXPECTED
+    assert not db.get_calls('aggregate', 'book')
+    assert len(db.get_calls('find', 'book')) == 3
+
+
+@pytest.mark.parametrize('args', ['', 'last: 2'])
+def test_children_without_first_are_read_per_parent(args):
+    insert_authors()
+    result = execute('{ authors(first: 10) { edges { node { '
+                     f'books{f"({args})" if args else ""} '
+                     '{ edges { node { title } } } } } } }')
+    assert not result.errors, result.errors
+    assert not db.get_calls('aggregate', 'book')
+
+
+def test_children_keep_the_parent_projection():
+    insert_authors()
+    execute(QUERY)
+    find, = db.get_calls('find', 'author')
+    assert set(find.args[1]) == {'_id', 'name'}
+
+
+def test_children_count_is_capped():
+    insert_authors()
+    result = execute('{ authors(first: 10) { edges { node { name '
+                     'cappedBooks(first: 1) { totalCount } } } } }')
+    assert not result.errors, result.errors
+    assert [e['node']['cappedBooks']['totalCount'] for e in
+            result.data['authors']['edges']] == [1, 2, 2]
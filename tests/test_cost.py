@@ -0,0 +1,90 @@
+import asyncio
+
+from graphql import parse
+from graphql.execution.executors.asyncio import AsyncioExecutor
+
+from graphene_umongo import (UMongoCostAnalysisBackend, get_query_cost,
+                             get_request_cost)
+
+from .models import db
+from .schema import execute, schema
+
+QUERIES = '''
+query Cheap { books(first: 2) { edges { node { title } } } }
+query Expensive {
+    authors(first: 10) { edges { node {
+        books(first: 10) { totalCount edges { node { title } } } } } }
+}
+'''
+
+
+def test_get_query_cost():
+    document = parse(QUERIES)
+    assert get_query_cost(schema, document, operation_name='Cheap') == 2
+    assert get_query_cost(schema, document, operation_name='Expensive') \
+        == 10 + 10 * 10 + 10
+    assert get_query_cost(schema, document) == 0
+    assert get_query_cost(schema, parse(
+        '{ books { edges { node { title } } } }'), default_page_size=5) == 5
+
+
+def test_only_the_executed_operation_is_scored():
+    context = {}
+    result = execute(QUERIES, context=context, operation_name='Cheap',
+                     backend=UMongoCostAnalysisBackend(max_cost=50))
+    assert not result.errors, result.errors
+    assert result.extensions['cost'] == {'requested': 2, 'maximum': 50}
+    assert get_request_cost(context) == 2
+
+
+def test_expensive_operation_is_rejected_before_reading():
+    result = execute(QUERIES, operation_name='Expensive',
+                     backend=UMongoCostAnalysisBackend(max_cost=50))
+    assert result.errors
+    assert 'Query cost 120 exceeds the maximum cost of 50' in \
+        str(result.errors[0])
+    assert result.extensions['cost'] == {'requested': 120, 'maximum': 50}
+    assert not db.calls
+
+
+def test_cost_extension_with_promises():
+    loop = asyncio.get_event_loop()
+    promise = execute(QUERIES, operation_name='Cheap',
+                      executor=AsyncioExecutor(loop), return_promise=True,
+                      backend=UMongoCostAnalysisBackend(max_cost=50))
+    result = loop.run_until_complete(promise.future)
+    assert not result.errors, result.errors
+    assert result.extensions['cost'] == {'requested': 2, 'maximum': 50}
+
+
+def test_variable_defaults_are_scored():
+    query = 'query ($n: Int = 1000) { books(first: $n) ' \
+        '{ edges { node { title } } } }'
+    assert get_query_cost(schema, parse(query)) == 1000
+    assert get_query_cost(schema, parse(query), {'n': 3}) == 3
+
+    result = execute(query, backend=UMongoCostAnalysisBackend(max_cost=200))
+    assert 'Query cost 1000 exceeds the maximum cost of 200' in \
+        str(result.errors[0])
+    assert not db.calls
+
+
+def test_connections_read_the_default_page_size():
+    db['book'].collection.insert_many([{'title': f't{i}'} for i in range(3)])
+    query = '{ books { pageInfo { hasNextPage } edges { node { title } } } }'
+
+    result = execute(query, backend=UMongoCostAnalysisBackend(
+        max_cost=50, default_page_size=2))
+    assert not result.errors, result.errors
+    assert result.extensions['cost'] == {'requested': 2, 'maximum': 50}
+    assert len(result.data['books']['edges']) == 2
+    assert result.data['books']['pageInfo']['hasNextPage']
+    call, = db.get_calls('find', 'book')
+    assert call.kwargs['limit'] == 3
+
+    # Without a cost analysis connections are read whole
+    db.calls.clear()
+    result = execute(query)
+    assert len(result.data['books']['edges']) == 3
+    call, = db.get_calls('find', 'book')
+    assert call.kwargs['limit'] == 0
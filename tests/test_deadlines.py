@@ -0,0 +1,61 @@
+import time
+
+from graphene_umongo import get_remaining_time, set_request_deadline
+
+from .models import db
+from .schema import execute
+
+
+def insert_books(count):
+    db['book'].collection.insert_many(
+        [{'title': f't{i}'} for i in range(count)])
+
+
+def test_reads_run_with_remaining_time():
+    insert_books(2)
+    context = {}
+    set_request_deadline(context, 10)
+    result = execute('{ books(first: 2) { edges { node { title } } } }',
+                     context=context)
+    assert not result.errors, result.errors
+
+    call, = db.get_calls('find', 'book')
+    assert 0 < call.kwargs['max_time_ms'] <= 10000
+    assert 0 < get_remaining_time(context) <= 10
+
+
+def test_slow_read_exceeds_deadline():
+    insert_books(3)
+    db.latency = 0.1
+    context = {}
+    set_request_deadline(context, 0.05)
+    start = time.monotonic()
+    result = execute('{ books(first: 3) { edges { node { title } } } }',
+                     context=context)
+    assert time.monotonic() - start < 0.3
+
+    error, = result.errors
+    assert 'Deadline exceeded reading book' in str(error)
+    cursor, = db.cursors
+    assert cursor.closed
+
+
+def test_expired_deadline_reads_nothing():
+    insert_books(1)
+    context = {}
+    set_request_deadline(context, -1)
+    result = execute('{ books(first: 1) { edges { node { title } } } }',
+                     context=context)
+
+    error, = result.errors
+    assert 'Deadline exceeded before reading book' in str(error)
+    assert not db.calls
+
+
+def test_without_deadline():
+    insert_books(1)
+    assert get_remaining_time({}) is None
+    result = execute('{ books(first: 1) { edges { node { title } } } }')
+    assert not result.errors, result.errors
+    call, = db.get_calls('find', 'book')
+    assert call.kwargs['max_time_ms'] is None
@@ -0,0 +1,83 @@
+from bson import ObjectId
+
+from .models import db
+from .schema import (AuthorType, BookAttributes, BookType, execute,
+                     to_global_id)
+
+
+def test_input_decoder():
+    author = ObjectId()
+    value = BookAttributes._meta.container({
+        'title': 't', 'pages': 3, 'tags': ['a'],
+        'address': {'street': 's'},
+        'author': to_global_id('AuthorType', author)})
+    assert value.to_dictionary() == {
+        'title': 't', 'pages': 3, 'tags': ['a'],
+        'address': {'street': 's'}, 'author': author}
+
+
+def test_references_are_decoded_with_the_referenced_pk():
+    author, publisher = ObjectId(), str(ObjectId())
+    value = BookAttributes._meta.container({
+        'title': 't',
+        'author': to_global_id('AuthorType', author),
+        'publisher': to_global_id('PublisherType', publisher)})
+
+    references = {}
+    assert value.to_dictionary(references=references) == {
+        'title': 't', 'author': author, 'publisher': publisher}
+    assert references == {'Author': [author], 'Publisher': [publisher]}
+
+
+def test_raw_reference_ids_are_decoded():
+    author = ObjectId()
+    value = BookAttributes._meta.container({'author': str(author),
+                                            'publisher': 'acme'})
+    assert value.to_dictionary() == {'author': author, 'publisher': 'acme'}
+
+
+def test_document_decoder():
+    _id, author = ObjectId(), ObjectId()
+    book = BookType._meta.decoder({
+        '_id': _id, 'title': 't', 'author': author,
+        'address': {'street': 's', 'number': 1}, 'unknown': 1})
+    assert isinstance(book, BookType)
+    assert (book.id, book.title, book.author) == (_id, 't', author)
+    assert book.address == {'street': 's', 'number': 1}
+    assert book.pages is None and book.publisher is None
+    assert not hasattr(book, 'unknown')
+    assert BookType._meta.decoder(None) is None
+
+
+def test_document_decoder_decodes_joined_references():
+    author = ObjectId()
+    book = BookType._meta.decoder({
+        '_id': ObjectId(), 'author': {'_id': author, 'name': 'a'}})
+    assert isinstance(book.author, AuthorType)
+    assert (book.author.id, book.author.name) == (author, 'a')
+
+
+def test_polymorphic_embedded_documents_use_the_discriminator():
+    book = BookType._meta.decoder({'_id': ObjectId(), 'pet': {
+        '_cls': 'Dog', 'name': 'rex', 'barks': True}, 'pets': [
+        {'_cls': 'Cat', 'name': 'c', 'lives': 9},
+        {'_cls': 'Dog', 'name': 'd'}]})
+    assert type(book.pet).__name__ == 'Dog'
+    assert (book.pet.name, book.pet.barks) == ('rex', True)
+    assert [type(p).__name__ for p in book.pets] == ['Cat', 'Dog']
+    assert book.pets[0].lives == 9
+
+
+def test_polymorphic_embedded_documents_resolve_their_type():
+    db['book'].collection.insert_one({'title': 't', 'pets': [
+        {'_cls': 'Cat', 'name': 'c', 'lives': 9},
+        {'_cls': 'Dog', 'name': 'd', 'barks': False}]})
+    result = execute('{ books(first: 1) { edges { node { pets { '
+                     '__typename ... on Cat { name lives } '
+                     '... on Dog { name barks } } } } } }')
+    assert not result.errors, result.errors
+    assert result.data['books']['edges'][0]['node']['pets'] == [
+        {'__typename': 'Cat', 'name': 'c', 'lives': 9},
+        {'__typename': 'Dog', 'name': 'd', 'barks': False}]
+    find, = db.get_calls('find', 'book')
+    assert 'pets._cls' in find.args[1]
@@ -0,0 +1,129 @@
+import asyncio
+
+from bson import ObjectId
+
+from graphene_umongo import UMongoDocumentCache
+from graphene_umongo.registry import get_global_registry
+
+from .models import Profile, db
+from .schema import execute, profile_cache, to_global_id
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0
+
+    def __call__(self):
+        return self.now
+
+
+def run(coroutine):
+    return asyncio.get_event_loop().run_until_complete(coroutine)
+
+
+def test_hits_and_misses():
+    cache = UMongoDocumentCache(maxsize=2, ttl=None)
+    assert cache.get(1) is None
+    cache.set(1, None, 'one')
+    cache.set(1, {'name': 1}, 'one name')
+    assert cache.get(1) == 'one'
+    assert cache.get(1, {'name': 1}) == 'one name'
+    assert cache.get(2) is None
+
+    cache.set(2, None, 'two')
+    assert cache.get(1) is None
+    assert cache.stats() == {'size': 2, 'hits': 2, 'misses': 3,
+                             'evictions': 1, 'invalidations': 0}
+
+
+def test_ttl():
+    clock = Clock()
+    cache = UMongoDocumentCache(ttl=10, clock=clock)
+    cache.set(1, None, 'one')
+    clock.now = 9
+    assert cache.get(1) == 'one'
+    clock.now = 10
+    assert cache.get(1) is None
+    assert cache.stats()['size'] == 0
+
+
+def test_invalidate():
+    cache = UMongoDocumentCache()
+    cache.set(1, None, 'one')
+    cache.set(1, {'name': 1}, 'one name')
+    cache.set(2, None, 'two')
+    cache.invalidate(1)
+    assert cache.get(1) is None
+    assert cache.get(1, {'name': 1}) is None
+    assert cache.get(2) == 'two'
+    cache.invalidate()
+    assert cache.get(2) is None
+
+
+def test_node_reads_are_cached():
+    _id = ObjectId()
+    db['profile'].collection.insert_one({'_id': _id, 'nickname': 'n'})
+    query = '''query ($id: ID!) {
+        node(id: $id) { ... on ProfileType { nickname } } }'''
+    for _ in range(2):
+        result = execute(query, {'id': to_global_id('ProfileType', _id)})
+        assert not result.errors, result.errors
+        assert result.data['node'] == {'nickname': 'n'}
+    assert len(db.calls) == 1
+
+
+def test_set_skipped_after_invalidation():
+    cache = UMongoDocumentCache()
+    generation = cache.generation()
+    cache.invalidate(1)
+    cache.set(1, None, 'stale')
+    assert cache.get(1) == 'stale'
+
+    cache.invalidate(1)
+    cache.set(1, None, 'stale', generation)
+    cache.set(2, None, 'two', generation)
+    assert cache.get(1) is None
+    assert cache.get(2) == 'two'
+
+    generation = cache.generation()
+    cache.invalidate()
+    cache.set(2, None, 'stale', generation)
+    assert cache.get(2) is None
+
+
+def test_find_one_invalidated_while_reading():
+    queryset = get_global_registry().get_queryset(Profile)
+    _id = ObjectId()
+    db['profile'].collection.insert_one({'_id': _id, 'nickname': 'old'})
+    db.latency = 0.01
+
+    async def read_and_write():
+        read = asyncio.ensure_future(queryset.find_one({'_id': _id}))
+        await asyncio.sleep(0)
+        db['profile'].collection.update_one(
+            {'_id': _id}, {'$set': {'nickname': 'new'}})
+        queryset.invalidate(_id)
+        assert (await read).nickname == 'old'
+        return await queryset.find_one({'_id': _id})
+
+    assert run(read_and_write()).nickname == 'new'
+    assert len(db.get_calls('find_one', 'profile')) == 2
+
+
+def test_batch_with_one_document_is_cached():
+    _id = ObjectId()
+    db['profile'].collection.insert_one({'_id': _id, 'nickname': 'n'})
+    query = '''query ($ids: [ID!]!) {
+        nodes(ids: $ids) { ... on ProfileType { nickname } } }'''
+    ids = [to_global_id('ProfileType', _id),
+           to_global_id('ProfileType', ObjectId())]
+
+    result = execute(query, {'ids': ids})
+    assert not result.errors, result.errors
+    assert result.data['nodes'][0] == {'nickname': 'n'}
+    assert len(db.get_calls('find', 'profile')) == 1
+    assert profile_cache.stats()['size'] == 1
+
+    result = execute(query, {'ids': ids[:1]})
+    assert result.data['nodes'] == [{'nickname': 'n'}]
+    assert not db.get_calls('find_one', 'profile')
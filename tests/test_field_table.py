@@ -0,0 +1,32 @@
+from graphene_umongo.utils import get_field_table, iter_fields
+
+from .models import Book, Publisher
+
+
+def test_field_table():
+    table = {i.name: i for i in get_field_table(Book)}
+    assert {'title', 'pages', 'tags', 'author', 'address', 'pet',
+            'pets'} <= set(table)
+
+    assert table['tags'].is_list and not table['title'].is_list
+    # Embedded models are kept as templates
+    assert table['address'].embedded_model.__name__ == 'Address'
+    assert table['pets'].embedded_model.__name__ == 'Pet'
+    assert {m.__name__ for m in table['pet'].offspring} == {'Dog', 'Cat'}
+    assert table['title'].embedded_model is None
+
+    _id, = [i for i in get_field_table(Publisher) if i.name == 'id']
+    assert (_id.attribute, _id.mongo_name) == ('_id', '_id')
+
+
+def test_field_table_is_computed_once():
+    get_field_table.cache_clear()
+    get_field_table(Book)
+    get_field_table(Book)
+    assert get_field_table.cache_info().hits == 1
+
+
+def test_iter_fields_reads_the_table():
+    names = [n for n, _, _ in iter_fields(Book, deep=True)]
+    assert 'address.street' in names and 'address.number' in names
+    assert 'title' in names and 'address' not in names
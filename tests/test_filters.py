@@ -0,0 +1,61 @@
+from bson import ObjectId
+
+from graphene_umongo.filters import compile_filter
+
+from .models import Book, db
+from .schema import execute, to_global_id
+
+
+def test_filter_is_compiled_to_a_match():
+    db['book'].collection.insert_many([
+        {'title': f't{i}', 'pages': i} for i in range(4)])
+    result = execute('{ books(filter: {pages: {gte: 2}, '
+                     'title: {prefix: "t"}}) { edges { node { title } } } }')
+    assert not result.errors, result.errors
+    assert [e['node']['title'] for e in result.data['books']['edges']] == \
+        ['t2', 't3']
+    find, = db.get_calls('find', 'book')
+    assert find.args[0] == {'pages': {'$gte': 2}, 'title': {'$regex': '^t'}}
+
+
+def test_compile_filter_decodes_global_ids():
+    _id, author = ObjectId(), ObjectId()
+    match = compile_filter(Book, {
+        'id': {'eq': to_global_id('BookType', _id)},
+        'author': {'in_': [to_global_id('AuthorType', author), str(author)]},
+        'publisher': {'eq': to_global_id('PublisherType', 'acme')},
+    })
+    assert match == {
+        '_id': {'$eq': _id},
+        'author': {'$in': [author, author]},
+        'publisher': {'$eq': 'acme'},
+    }
+
+
+def test_compile_filter_keeps_raw_ids():
+    _id = ObjectId()
+    assert compile_filter(Book, {'id': {'in_': [str(_id)]},
+                                 'publisher': {'ne': 'acme'}}) == {
+        '_id': {'$in': [_id]}, 'publisher': {'$ne': 'acme'}}
+
+
+def test_filter_by_reference_global_id():
+    authors = [ObjectId(), ObjectId()]
+    db['book'].collection.insert_many([
+        {'title': 't0', 'author': authors[0], 'publisher': 'acme'},
+        {'title': 't1', 'author': authors[1], 'publisher': 'other'},
+    ])
+    query = '''query ($filter: BookFilter) {
+        books(filter: $filter) { edges { node { title } } } }'''
+
+    for _filter, titles in [
+            ({'author': {'eq': to_global_id('AuthorType', authors[1])}},
+             ['t1']),
+            ({'author': {'in': [to_global_id('AuthorType', a)
+                                for a in authors]}}, ['t0', 't1']),
+            ({'publisher': {'eq': to_global_id('PublisherType', 'acme')}},
+             ['t0'])]:
+        result = execute(query, {'filter': _filter})
+        assert not result.errors, result.errors
+        assert [e['node']['title'] for e in
+                result.data['books']['edges']] == titles
@@ -0,0 +1,53 @@
+from bson import ObjectId
+
+from graphene_umongo.instrumentation import (InMemoryCollector,
+                                             instrument_request,
+                                             set_instrumentation)
+
+from .models import db
+from .schema import execute
+
+
+def test_queries_are_attributed_to_fields():
+    author = ObjectId()
+    db['author'].collection.insert_one({'_id': author, 'name': 'a'})
+    db['book'].collection.insert_many([
+        {'title': f't{i}', 'author': author} for i in range(3)])
+
+    collector = InMemoryCollector()
+    context = {}
+    instrument_request(context, collector)
+    result = execute('{ books(first: 3, filter: {title: {prefix: "t"}}) '
+                     '{ edges { node { title author { name } } } } }',
+                     context=context)
+    assert not result.errors, result.errors
+
+    books, authors = collector.queries
+    assert (books.field, books.collection, books.operation) == \
+        ('books', 'book', 'find')
+    assert books.filter_keys == ['title']
+    assert (books.limit, books.documents) == (4, 3)
+    assert books.bytes > 0
+    assert authors.collection == 'author'
+    assert authors.documents == 1
+    assert authors.field.startswith('books.edges.0.node.author')
+
+    assert 'books' in [f.field for f in collector.fields]
+    summary = collector.summary()
+    assert summary['books']['queries'] == 1
+    assert summary['books']['documents'] == 3
+
+
+def test_default_instrumentation():
+    collector = InMemoryCollector()
+    set_instrumentation(collector)
+    try:
+        execute('{ books(first: 1) { edges { node { title } } } }')
+    finally:
+        set_instrumentation(None)
+    query, = collector.queries
+    assert query.field == 'books'
+
+    collector.clear()
+    execute('{ books(first: 1) { edges { node { title } } } }')
+    assert not collector.queries
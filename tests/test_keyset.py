@@ -0,0 +1,75 @@
+from graphene_umongo.querysets import keyset_match
+
+from .models import db
+from .schema import execute
+
+QUERY = '''query($first: Int, $after: String, $last: Int, $before: String) {
+  booksByKeyset(first: $first, after: $after, last: $last, before: $before,
+                sort: [PAGES_ASC]) {
+    edges { node { title pages } }
+    pageInfo { hasNextPage hasPreviousPage startCursor endCursor }
+  }
+}'''
+
+
+def insert_books():
+    # 3 of 10 documents have no pages, they sort first
+    db['book'].collection.insert_many(
+        [{'title': f'n{i}'} for i in range(3)] +
+        [{'title': f't{i}', 'pages': i % 4} for i in range(7)])
+
+
+def paginate_forward(size):
+    titles, after = [], None
+    while True:
+        result = execute(QUERY, {'first': size, 'after': after})
+        assert not result.errors, result.errors
+        connection = result.data['booksByKeyset']
+        titles.extend(e['node']['title'] for e in connection['edges'])
+        if not connection['pageInfo']['hasNextPage']:
+            return titles
+        after = connection['pageInfo']['endCursor']
+
+
+def paginate_backward(size):
+    titles, before = [], None
+    while True:
+        result = execute(QUERY, {'last': size, 'before': before})
+        assert not result.errors, result.errors
+        connection = result.data['booksByKeyset']
+        titles[:0] = [e['node']['title'] for e in connection['edges']]
+        if not connection['pageInfo']['hasPreviousPage']:
+            return titles
+        before = connection['pageInfo']['startCursor']
+
+
+def test_keyset_match_brackets_nulls():
+    sort = [('pages', 1), ('_id', 1)]
+    assert keyset_match(sort, [None, 1]) == {'$or': [
+        {'pages': {'$ne': None}},
+        {'pages': None, '_id': {'$gt': 1}},
+    ]}
+    assert keyset_match(sort, [None, 1], after=False) == {'$or': [
+        {'pages': None, '_id': {'$lt': 1}},
+    ]}
+    assert keyset_match(sort, [2, 1], after=False) == {'$or': [
+        {'$or': [{'pages': {'$lt': 2}}, {'pages': None}]},
+        {'pages': 2, '_id': {'$lt': 1}},
+    ]}
+
+
+def test_forward_pagination_crosses_nulls():
+    insert_books()
+    expected = [d['title'] for d in db['book'].collection.find().sort(
+        [('pages', 1), ('_id', 1)])]
+    assert expected[:3] == ['n0', 'n1', 'n2']
+    for size in (1, 2, 3, 4):
+        assert paginate_forward(size) == expected
+
+
+def test_backward_pagination_crosses_nulls():
+    insert_books()
+    expected = [d['title'] for d in db['book'].collection.find().sort(
+        [('pages', 1), ('_id', 1)])]
+    for size in (1, 2, 3):
+        assert paginate_backward(size) == expected
@@ -0,0 +1,213 @@
+from bson import ObjectId
+
+from .models import db
+from .schema import UpdateBook, execute, to_global_id
+
+UPSERT_BOOK = '''mutation ($input: BookInput!) {
+    upsertBook(input: $input) { title pages } }'''
+
+UPDATE_BOOK = '''mutation ($input: BookInput!) {
+    updateBook(input: $input) { title pages tags } }'''
+
+UPSERT_REVIEW = '''mutation ($input: ReviewInput!) {
+    upsertReview(input: $input) { stars } }'''
+
+
+def get_book(_id):
+    return db['book'].collection.find_one({'_id': _id})
+
+
+def test_upsert_book():
+    result = execute(UPSERT_BOOK, {'input': {'title': 't', 'pages': 3}})
+    assert not result.errors, result.errors
+    assert result.data['upsertBook'] == {'title': 't', 'pages': 3}
+    call, = db.get_calls('update_one')
+    assert call.kwargs['upsert']
+    _id = call.args[0]['_id']
+    assert get_book(_id) == {'_id': _id, 'title': 't', 'pages': 3}
+
+
+def test_upsert_books_writes_once():
+    result = execute('''mutation ($inputs: [BookInput!]!) {
+        upsertBooks(inputs: $inputs) { title } }''', {'inputs': [
+        {'title': 't0', 'pages': 1}, {'title': 't1', 'pages': 2}]})
+    assert not result.errors, result.errors
+    assert result.data['upsertBooks'] == [{'title': 't0'}, {'title': 't1'}]
+    call, = db.get_calls('bulk_write')
+    assert len(call.args[0]) == 2
+
+
+def test_insert_requires_required_fields():
+    result = execute(UPSERT_BOOK, {'input': {'pages': 3}})
+    assert result.errors
+    assert 'title' in str(result.errors[0])
+    assert not db.get_calls('update_one')
+    assert db['book'].collection.count_documents({}) == 0
+
+
+def test_insert_writes_defaults():
+    result = execute(UPSERT_BOOK, {'input': {'title': 't'}})
+    assert not result.errors, result.errors
+    assert result.data['upsertBook'] == {'title': 't', 'pages': 10}
+
+
+def test_upsert_keeps_fields_not_sent():
+    _id = ObjectId()
+    db['book'].collection.insert_one({'_id': _id, 'title': 't', 'pages': 50})
+
+    result = execute(UPSERT_BOOK, {'input': {
+        'id': to_global_id('BookType', _id), 'title': 'u'}})
+    assert not result.errors, result.errors
+    assert result.data['upsertBook'] == {'title': 'u', 'pages': 50}
+    call, = db.get_calls('update_one')
+    assert call.args[1] == {'$set': {'title': 'u'},
+                            '$setOnInsert': {'pages': 10}}
+
+
+def test_upsert_inserts_defaults():
+    _id = ObjectId()
+    result = execute(UPSERT_BOOK, {'input': {
+        'id': to_global_id('BookType', _id), 'title': 'u'}})
+    assert not result.errors, result.errors
+    assert get_book(_id) == {'_id': _id, 'title': 'u', 'pages': 10}
+
+
+def test_upsert_sends_no_empty_operators():
+    _id = ObjectId()
+    result = execute(UPSERT_REVIEW, {'input': {
+        'id': to_global_id('ReviewType', _id), 'stars': 3}})
+    assert not result.errors, result.errors
+    call, = db.get_calls('update_one')
+    assert call.args[1] == {'$set': {'stars': 3}}
+
+    db.calls.clear()
+    _id = ObjectId()
+    result = execute(UPSERT_REVIEW, {'input': {
+        'id': to_global_id('ReviewType', _id)}})
+    assert not result.errors, result.errors
+    call, = db.get_calls('update_one')
+    assert call.args[1] == {'$setOnInsert': {'_id': _id}}
+    assert db['review'].collection.find_one({'_id': _id}) == {'_id': _id}
+
+
+def test_upsert_books_keeps_fields_not_sent():
+    _id = ObjectId()
+    db['book'].collection.insert_one({'_id': _id, 'title': 't', 'pages': 50})
+
+    result = execute('''mutation ($inputs: [BookInput!]!) {
+        upsertBooks(inputs: $inputs) { title pages } }''', {'inputs': [
+        {'id': to_global_id('BookType', _id), 'title': 'u'},
+        {'title': 'v'},
+    ]})
+    assert not result.errors, result.errors
+    assert result.data['upsertBooks'] == [{'title': 'u', 'pages': 50},
+                                          {'title': 'v', 'pages': 10}]
+
+
+def test_update_book():
+    _id = ObjectId()
+    db['book'].collection.insert_one(
+        {'_id': _id, 'title': 't', 'pages': 50, 'tags': ['a']})
+
+    result = execute(UPDATE_BOOK, {'input': {
+        'id': to_global_id('BookType', _id), 'title': 'u', 'pages': 60,
+        'tags': ['b']}})
+    assert not result.errors, result.errors
+    assert result.data['updateBook'] == {
+        'title': 'u', 'pages': 60, 'tags': ['a', 'b']}
+    assert [c.operation for c in db.calls] == ['find_one_and_update']
+
+
+def test_compile_update_only_sets_sent_fields():
+    assert UpdateBook.compile_update({'title': 'u'}) == \
+        {'$set': {'title': 'u'}}
+    assert UpdateBook.compile_update(
+        {'pages': None, 'address': {'street': 's', 'number': None}}) == {
+        '$set': {'address.street': 's'},
+        '$unset': {'pages': '', 'address.number': ''}}
+    assert UpdateBook.compile_update({'tags': ['a']}) == \
+        {'$push': {'tags': {'$each': ['a']}}}
+
+
+def test_partial_update_leaves_other_fields():
+    _id = ObjectId()
+    db['book'].collection.insert_one({
+        '_id': _id, 'title': 't', 'pages': 50, 'tags': ['a'],
+        'address': {'street': 's', 'number': 1}})
+
+    result = execute(UPDATE_BOOK, {'input': {
+        'id': to_global_id('BookType', _id), 'title': 'u',
+        'address': {'number': None}}})
+    assert not result.errors, result.errors
+    assert result.data['updateBook'] == {
+        'title': 'u', 'pages': 50, 'tags': ['a']}
+    assert get_book(_id) == {'_id': _id, 'title': 'u', 'pages': 50,
+                             'tags': ['a'], 'address': {'street': 's'}}
+
+
+def test_update_unsets_explicit_nulls():
+    _id = ObjectId()
+    db['book'].collection.insert_one({'_id': _id, 'title': 't', 'pages': 50})
+
+    result = execute(UPDATE_BOOK, {'input': {
+        'id': to_global_id('BookType', _id), 'pages': None}})
+    assert not result.errors, result.errors
+    call, = db.get_calls('find_one_and_update')
+    assert call.args[1] == {'$unset': {'pages': ''}}
+    assert get_book(_id) == {'_id': _id, 'title': 't'}
+
+
+def test_string_pk_requires_an_id():
+    query = '''mutation ($input: PublisherInput!) {
+        upsertPublisher(input: $input) { name } }'''
+    result = execute(query, {'input': {'name': 'p'}})
+    error, = result.errors
+    assert 'An id is required to write a Publisher' in str(error)
+    assert not db.get_calls('update_one')
+
+    result = execute(query, {'input': {
+        'id': to_global_id('PublisherType', 'p1'), 'name': 'p'}})
+    assert not result.errors, result.errors
+    assert db['publisher'].collection.find_one() == {'_id': 'p1', 'name': 'p'}
+
+
+UPSERT_BOOK_ATTRIBUTES = '''mutation ($inputs: [BookAttributes!]!) {
+    upsertBookAttributes(inputs: $inputs) { title author { name } } }'''
+
+
+# umongo references only hold ObjectIds, even to string keys
+PUBLISHER = str(ObjectId())
+
+
+def book_attributes(title, author):
+    return {'title': title, 'pages': 1, 'tags': [],
+            'address': {'street': 's', 'number': 1},
+            'author': to_global_id('AuthorType', author),
+            'publisher': to_global_id('PublisherType', PUBLISHER)}
+
+
+def test_references_are_checked_in_one_query():
+    authors = [ObjectId(), ObjectId()]
+    db['author'].collection.insert_many([
+        {'_id': a, 'name': f'a{i}'} for i, a in enumerate(authors)])
+    db['publisher'].collection.insert_one({'_id': PUBLISHER, 'name': 'p'})
+
+    result = execute(UPSERT_BOOK_ATTRIBUTES, {'inputs': [
+        book_attributes('t0', authors[0]),
+        book_attributes('t1', authors[1])]})
+    assert not result.errors, result.errors
+    assert result.data['upsertBookAttributes'] == [
+        {'title': 't0', 'author': {'name': 'a0'}},
+        {'title': 't1', 'author': {'name': 'a1'}}]
+    # Checking the references loaded the authors read back
+    assert len(db.get_calls(collection='author')) == 1
+    assert len(db.get_calls(collection='publisher')) == 1
+
+
+def test_unknown_references_are_not_written():
+    missing = ObjectId()
+    db['publisher'].collection.insert_one({'_id': PUBLISHER, 'name': 'p'})
+    result = execute(UPSERT_BOOK_ATTRIBUTES, {'inputs': [
+        book_attributes('t0', missing)]})
+    assert f'Unknown Author references: {missing}' in str(result.errors[0])
+    assert not db.get_calls('bulk_write')
@@ -0,0 +1,53 @@
+from bson import ObjectId
+
+from .models import db
+from .schema import execute, to_global_id
+
+
+def insert_books(count):
+    ids = [ObjectId() for _ in range(count)]
+    db['book'].collection.insert_many([
+        {'_id': _id, 'title': f't{i}'} for i, _id in enumerate(ids)])
+    return ids
+
+
+def test_node_fetches_by_id():
+    _id, = insert_books(1)
+    result = execute('query ($id: ID!) { node(id: $id) { '
+                     '... on BookType { title } } }',
+                     {'id': to_global_id('BookType', _id)})
+    assert not result.errors, result.errors
+    assert result.data['node'] == {'title': 't0'}
+    call, = db.calls
+    assert call.operation == 'find_one'
+    assert call.args[0] == {'_id': _id}
+
+
+def test_nodes_are_batched():
+    ids = insert_books(2)
+    missing = ObjectId()
+    result = execute('''query ($a: ID!, $b: ID!, $c: ID!) {
+        a: node(id: $a) { ... on BookType { title } }
+        b: node(id: $b) { ... on BookType { title } }
+        c: node(id: $c) { id } }''', {
+        'a': to_global_id('BookType', ids[0]),
+        'b': to_global_id('BookType', ids[1]),
+        'c': to_global_id('BookType', missing)})
+    assert not result.errors, result.errors
+    assert result.data == {'a': {'title': 't0'}, 'b': {'title': 't1'},
+                           'c': None}
+    find, = db.calls
+    assert find.operation == 'find'
+    assert find.args[0] == {'_id': {'$in': ids + [missing]}}
+
+
+def test_nodes_field_keeps_the_order_of_ids():
+    ids = insert_books(3)
+    result = execute('query ($ids: [ID!]!) { nodes(ids: $ids) { '
+                     '... on BookType { title } } }',
+                     {'ids': [to_global_id('BookType', i)
+                              for i in reversed(ids)]})
+    assert not result.errors, result.errors
+    assert result.data['nodes'] == [{'title': 't2'}, {'title': 't1'},
+                                    {'title': 't0'}]
+    assert len(db.calls) == 1
@@ -0,0 +1,70 @@
+import pytest
+from graphql import GraphQLError
+from graphql_relay.connection.arrayconnection import offset_to_cursor
+
+from graphene_umongo.pagination import get_window
+
+from .models import db
+from .schema import execute
+
+
+def insert_books(count):
+    db['book'].collection.insert_many([
+        {'title': f't{i:02}', 'pages': i} for i in range(count)])
+
+
+def get_titles(result):
+    assert not result.errors, result.errors
+    return [e['node']['title'] for e in result.data['books']['edges']]
+
+
+def test_get_window():
+    assert get_window({'first': 5}) == (0, 5)
+    assert get_window({'last': 3}, count=10) == (7, 10)
+    assert get_window({'first': 5, 'after': 'YXJyYXljb25uZWN0aW9uOjQ='}) \
+        == (5, 10)
+
+
+@pytest.mark.parametrize('args', [{'first': -1}, {'last': -2}])
+def test_get_window_rejects_negative_sizes(args):
+    with pytest.raises(GraphQLError, match='non-negative'):
+        get_window(args, count=10)
+
+
+def test_first_is_pushed_down_as_limit():
+    insert_books(10)
+    result = execute('{ books(first: 3) { edges { node { title } } '
+                     'pageInfo { hasNextPage } } }')
+    assert get_titles(result) == ['t00', 't01', 't02']
+    assert result.data['books']['pageInfo']['hasNextPage']
+    find, = db.get_calls('find', 'book')
+    assert find.kwargs['limit'] == 4 and find.kwargs['skip'] == 0
+
+
+def test_last_uses_count():
+    insert_books(10)
+    result = execute('{ books(last: 2) { edges { node { title } } '
+                     'pageInfo { hasPreviousPage } } }')
+    assert get_titles(result) == ['t08', 't09']
+    assert result.data['books']['pageInfo']['hasPreviousPage']
+    find, = db.get_calls('find', 'book')
+    assert find.kwargs['skip'] == 8
+
+
+def test_negative_first_is_a_graphql_error():
+    insert_books(1)
+    result = execute('{ books(first: -1) { edges { node { title } } } }')
+    assert 'non-negative' in str(result.errors[0])
+    assert not db.get_calls('find')
+
+
+def test_stale_before_is_clamped_to_the_count():
+    insert_books(6)
+    before = offset_to_cursor(7)
+    assert get_window({'last': 1, 'before': before}, count=6) == (5, 6)
+
+    result = execute('query ($before: String) { books(last: 3, '
+                     'before: $before) { edges { node { title } } '
+                     'pageInfo { hasPreviousPage } } }', {'before': before})
+    assert get_titles(result) == ['t03', 't04', 't05']
+    assert result.data['books']['pageInfo']['hasPreviousPage']
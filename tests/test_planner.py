@@ -0,0 +1,70 @@
+import asyncio
+import logging
+
+import pytest
+from graphql import GraphQLError
+
+from graphene_umongo.planner import (COLLECTION_SCAN, INDEXED,
+                                     PREFIX_INDEXED, REJECT, WARN,
+                                     IndexPlanner)
+from graphene_umongo.registry import get_global_registry
+
+from .models import Book, db
+from .schema import execute
+
+
+def get_planner(policy=WARN):
+    return IndexPlanner(None, policy, indexes=[
+        [('author', 1), ('pages', -1)], [('title', 1)]])
+
+
+def test_classify():
+    planner = get_planner()
+    assert planner.classify() == INDEXED
+    assert planner.classify({'_id': 1}) == INDEXED
+    assert planner.classify({'author': 1}, [('pages', -1)]) == INDEXED
+    assert planner.classify({'author': 1}, [('pages', 1)]) == INDEXED
+    assert planner.classify({'$and': [{'author': 1}, {'pages': 2}]}) == \
+        INDEXED
+    assert planner.classify(sort=[('title', -1)]) == INDEXED
+    assert planner.classify({'author': 1, 'tags': 'a'}) == PREFIX_INDEXED
+    assert planner.classify({'author': 1}, [('title', 1)]) == \
+        PREFIX_INDEXED
+    assert planner.classify({'pages': 1}) == COLLECTION_SCAN
+
+
+def test_check_policies(caplog):
+    with caplog.at_level(logging.WARNING):
+        assert get_planner().check('book', {'pages': 1}) == COLLECTION_SCAN
+    assert 'not fully indexed (scan)' in caplog.text
+
+    planner = get_planner(REJECT)
+    with pytest.raises(GraphQLError, match='"book" is not fully indexed'):
+        planner.check('book', {'pages': 1})
+    # Partially indexed queries are only logged
+    assert planner.check('book', {'author': 1, 'tags': 'a'}) == \
+        PREFIX_INDEXED
+
+
+def test_load_indexes_from_the_server():
+    name = db['book'].collection.create_index([('pages', 1)])
+    try:
+        planner = IndexPlanner(Book, REJECT)
+        assert planner.classify({'pages': 1}) == COLLECTION_SCAN
+        asyncio.get_event_loop().run_until_complete(
+            planner.load(db['book']))
+        assert planner.classify({'pages': 1}) == INDEXED
+    finally:
+        db['book'].collection.drop_index(name)
+
+
+def test_unindexed_queries_are_rejected_before_reading():
+    queryset = get_global_registry().get_queryset(Book)
+    queryset.planner = get_planner(REJECT)
+    try:
+        result = execute('{ books(first: 1, filter: {pages: {eq: 1}}) '
+                         '{ edges { node { title } } } }')
+    finally:
+        del queryset.planner
+    assert 'not fully indexed' in str(result.errors[0])
+    assert not db.calls
@@ -0,0 +1,27 @@
+from .models import db
+from .schema import execute
+
+
+def test_projection_follows_the_selection():
+    db['book'].collection.insert_one({
+        'title': 't', 'pages': 3, 'address': {'street': 's', 'number': 1}})
+    result = execute('{ books(first: 1) { edges { node { '
+                     'title address { street } } } } }')
+    assert not result.errors, result.errors
+    assert result.data['books']['edges'][0]['node'] == {
+        'title': 't', 'address': {'street': 's'}}
+
+    find, = db.get_calls('find', 'book')
+    assert find.args[1] == {'_id': True, 'title': True,
+                            'address.street': True}
+
+
+def test_projection_of_embedded_meta_fields():
+    db['book'].collection.insert_one({'title': 't', 'address': {}})
+    result = execute('{ books(first: 1) { edges { node { id address { '
+                     '__typename } } } } }')
+    assert not result.errors, result.errors
+    assert result.data['books']['edges'][0]['node']['address'] == {
+        '__typename': 'Address'}
+    find, = db.get_calls('find', 'book')
+    assert find.args[1] == {'_id': True, 'address': True}
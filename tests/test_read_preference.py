@@ -0,0 +1,64 @@
+import pytest
+from pymongo.read_preferences import Primary, Secondary, SecondaryPreferred
+
+from graphene_umongo.querysets import get_read_preference
+
+from .models import db
+from .schema import execute
+
+
+def test_get_read_preference():
+    assert get_read_preference(None) is None
+    assert get_read_preference('primary') == Primary()
+    assert get_read_preference('secondaryPreferred', 90) == \
+        SecondaryPreferred(max_staleness=90)
+    preference = Secondary()
+    assert get_read_preference(preference) is preference
+
+
+def test_get_read_preference_rejects_unknown_names():
+    with pytest.raises(ValueError, match='primaryPreferred, secondary'):
+        get_read_preference('secondary_preferred')
+    with pytest.raises(ValueError, match='primary'):
+        get_read_preference('primary', 90)
+
+
+def get_read_preferences(collection):
+    return [c.options.get('read_preference')
+            for c in db.get_calls('find', collection)]
+
+
+def test_reads_are_routed_per_field():
+    db['book'].collection.insert_one({'title': 't'})
+    result = execute('''{
+        books(first: 1) { edges { node { title } } }
+        analyticsBooks(first: 1) { edges { node { title } } }
+    }''')
+    assert not result.errors, result.errors
+    assert result.data['books'] == result.data['analyticsBooks']
+    assert get_read_preferences('book') == [None, Secondary()]
+
+
+def test_reads_are_routed_per_type():
+    db['review'].collection.insert_one({'stars': 5})
+    result = execute('{ reviews(first: 1) { edges { node { stars } } } }')
+    assert not result.errors, result.errors
+    assert get_read_preferences('review') == [
+        SecondaryPreferred(max_staleness=90)]
+
+
+def test_mutations_read_back_from_the_primary():
+    result = execute('mutation { upsertReview(input: {stars: 4}) '
+                     '{ id stars } }')
+    assert not result.errors, result.errors
+    assert result.data['upsertReview']['stars'] == 4
+    assert get_read_preferences('review') == [Primary()]
+
+    db.calls.clear()
+    result = execute('mutation ($id: ID!) { updateReview(input: {id: $id}) '
+                     '{ stars } }',
+                     {'id': result.data['upsertReview']['id']})
+    assert not result.errors, result.errors
+    assert result.data['updateReview']['stars'] == 4
+    call, = db.get_calls('find_one', 'review')
+    assert call.options['read_preference'] == Primary()
@@ -0,0 +1,31 @@
+from bson import ObjectId
+
+from graphene_umongo.registry import Registry, get_global_registry
+
+from .models import db
+from .schema import AuthorType, BookType, execute
+
+
+def test_get_type_for_model_name():
+    registry = get_global_registry()
+    assert registry.get_type_for_model_name('Book') is BookType
+    assert registry.get_type_for_model_name('Author') is AuthorType
+    assert registry.get_type_for_model_name('Missing') is None
+    assert Registry().get_type_for_model_name('Book') is None
+
+
+def test_references_are_batched():
+    authors = [ObjectId() for _ in range(3)]
+    db['author'].collection.insert_many([
+        {'_id': _id, 'name': f'a{i}'} for i, _id in enumerate(authors)])
+    db['book'].collection.insert_many([
+        {'title': f't{i}', 'author': authors[i % 3]} for i in range(6)])
+
+    result = execute('{ books(first: 6) { edges { node { '
+                     'title author { name } } } } }')
+    assert not result.errors, result.errors
+    assert [e['node']['author']['name'] for e in
+            result.data['books']['edges']] == ['a0', 'a1', 'a2'] * 2
+
+    find, = db.get_calls('find', 'author')
+    assert set(find.args[0]['_id']['$in']) == set(authors)
@@ -0,0 +1,57 @@
+from graphene_umongo.querysets import invalidate_request_cache
+
+from .models import db
+from .schema import execute
+
+QUERY = '''{
+    a: books(first: 2) { edges { node { title } } }
+    b: books(first: 2) { edges { node { title } } }
+    c: books(first: 3) { edges { node { title } } }
+}'''
+
+
+def insert_books(start, stop):
+    db['book'].collection.insert_many([
+        {'title': f't{i}'} for i in range(start, stop)])
+
+
+def test_identical_reads_are_shared_within_a_request():
+    insert_books(0, 3)
+    result = execute(QUERY)
+    assert not result.errors, result.errors
+    assert result.data['a'] == result.data['b']
+    assert len(db.get_calls('find', 'book')) == 2
+
+
+def test_reads_are_not_shared_across_requests():
+    insert_books(0, 3)
+    execute(QUERY)
+    insert_books(3, 4)
+    result = execute('{ books(first: 4) { edges { node { title } } } }')
+    assert len(result.data['books']['edges']) == 4
+    assert len(db.get_calls('find', 'book')) == 3
+
+
+def test_writes_invalidate_the_request_cache():
+    insert_books(0, 1)
+    context = {}
+    query = '{ books(first: 5) { edges { node { title } } } }'
+    execute(query, context=context)
+    insert_books(1, 2)
+    result = execute(query, context=context)
+    assert len(result.data['books']['edges']) == 1
+
+    invalidate_request_cache(context, 'book')
+    result = execute(query, context=context)
+    assert len(result.data['books']['edges']) == 2
+
+
+def test_upsert_invalidates_the_request_cache():
+    context = {}
+    query = '{ books(first: 5) { edges { node { title } } } }'
+    execute(query, context=context)
+    result = execute('mutation { upsertBook(input: {title: "t"}) '
+                     '{ title } }', context=context)
+    assert not result.errors, result.errors
+    result = execute(query, context=context)
+    assert result.data['books']['edges'] == [{'node': {'title': 't'}}]
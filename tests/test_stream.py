@@ -0,0 +1,82 @@
+import asyncio
+
+import graphene
+from graphql.execution.executors.asyncio import AsyncioExecutor
+
+from graphene_umongo import UMongoStreamField
+from graphene_umongo.registry import get_global_registry
+
+from .models import Book, db
+from .schema import BookType, schema
+
+
+def run(coroutine):
+    return asyncio.get_event_loop().run_until_complete(coroutine)
+
+
+def insert_books(count):
+    db['book'].collection.insert_many([
+        {'title': f't{i}', 'pages': i} for i in range(count)])
+
+
+def test_stream_yields_decoded_documents():
+    insert_books(5)
+    queryset = get_global_registry().get_queryset(Book)
+
+    async def collect():
+        return [b async for b in queryset.stream(
+            {'pages': {'$gte': 1}}, {'title': True},
+            sort=[('pages', -1)], batch_size=2)]
+
+    books = run(collect())
+    assert all(isinstance(b, BookType) for b in books)
+    assert [b.title for b in books] == ['t4', 't3', 't2', 't1']
+    find, = db.get_calls('find', 'book')
+    assert find.kwargs['batch_size'] == 2
+    assert db.cursors[0].closed
+
+
+def test_stream_closes_the_cursor_when_abandoned():
+    insert_books(5)
+    queryset = get_global_registry().get_queryset(Book)
+
+    async def first():
+        documents = queryset.stream({})
+        async for book in documents:
+            await documents.aclose()
+            return book
+
+    assert run(first()).title == 't0'
+    cursor, = db.cursors
+    assert cursor.closed and cursor.documents
+
+
+def test_stream_subscription():
+    insert_books(3)
+    loop = asyncio.get_event_loop()
+    observable = schema.execute(
+        'subscription { bookStream { title } }',
+        allow_subscriptions=True, executor=AsyncioExecutor(loop))
+
+    results = []
+    done = loop.create_future()
+    observable.subscribe(on_next=results.append,
+                         on_error=done.set_exception,
+                         on_completed=lambda: done.set_result(None))
+    run(done)
+    assert not any(r.errors for r in results)
+    assert [r.data for r in results] == [
+        {'bookStream': {'title': t}} for t in ('t0', 't1', 't2')]
+    find, = db.get_calls('find', 'book')
+    assert find.kwargs['batch_size'] == 2
+
+
+def test_stream_field_is_rejected_outside_subscriptions():
+    class Query(graphene.ObjectType):
+        book_stream = UMongoStreamField(BookType)
+
+    result = graphene.Schema(query=Query).execute(
+        '{ bookStream { title } }', executor=AsyncioExecutor())
+    error, = result.errors
+    assert 'can only be a subscription root field' in str(error)
+    assert not db.calls
@@ -0,0 +1,86 @@
+import asyncio
+import time
+
+from graphene_umongo.registry import get_global_registry
+
+from .models import Book, db
+from .schema import execute
+
+
+def insert_books(start, stop):
+    db['book'].collection.insert_many([
+        {'title': f't{i:02}', 'pages': i} for i in range(start, stop)])
+
+
+def test_total_count_is_only_read_when_selected():
+    insert_books(0, 5)
+    result = execute('{ books(first: 2) { edges { node { title } } } }')
+    assert not result.errors, result.errors
+    assert not db.get_calls('count_documents')
+    assert not db.get_calls('estimated_document_count')
+
+    result = execute('{ books(first: 2, filter: {pages: {gte: 1}}) '
+                     '{ totalCount } }')
+    assert result.data['books']['totalCount'] == 4
+    count, = db.get_calls('count_documents')
+    assert count.args[0] == {'pages': {'$gte': 1}}
+
+
+def test_total_count_is_cached():
+    insert_books(0, 3)
+    query = '{ cachedBooks(first: 1) { totalCount } }'
+    assert execute(query).data['cachedBooks']['totalCount'] == 3
+
+    insert_books(3, 5)
+    assert execute(query).data['cachedBooks']['totalCount'] == 3
+    assert len(db.get_calls('estimated_document_count')) == 1
+
+
+def test_cached_count_does_not_place_last_window():
+    insert_books(0, 10)
+    query = '{ cachedBooks(last: 2) { totalCount edges { node { title } } } }'
+    result = execute(query)
+    assert result.data['cachedBooks']['totalCount'] == 10
+
+    insert_books(10, 12)
+    result = execute(query)
+    assert not result.errors, result.errors
+    connection = result.data['cachedBooks']
+    # The reported count may be stale, the page must not be
+    assert connection['totalCount'] == 10
+    assert [e['node']['title'] for e in connection['edges']] == \
+        ['t10', 't11']
+
+
+def test_count_cache_is_bounded():
+    queryset = get_global_registry().get_queryset(Book)
+    queryset.count_cache_size = 3
+    try:
+        async def count_all():
+            for i in range(10):
+                await queryset.count({'pages': i}, cache_ttl=60)
+        asyncio.get_event_loop().run_until_complete(count_all())
+        assert len(queryset._count_cache) == 3
+    finally:
+        del queryset.count_cache_size
+
+
+def test_count_cache_evicts_expired_entries_first():
+    queryset = get_global_registry().get_queryset(Book)
+    run = asyncio.get_event_loop().run_until_complete
+
+    def count(pages, size):
+        queryset._count_cache.clear()
+        queryset._count_cache['live'] = (1, time.monotonic() + 60)
+        queryset._count_cache['stale'] = (1, 0)
+        queryset.count_cache_size = size
+        run(queryset.count({'pages': pages}, cache_ttl=60))
+        return list(queryset._count_cache)
+
+    try:
+        # Expired entries are left alone until the cache is full
+        assert count(1, 3)[:2] == ['live', 'stale']
+        assert count(2, 2)[0] == 'live'
+        assert len(queryset._count_cache) == 2
+    finally:
+        del queryset.count_cache_size